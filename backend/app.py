@@ -2,18 +2,31 @@
 import os
 from flask import Flask, redirect, request, session, url_for, render_template_string, jsonify
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from google.cloud import firestore
 from google.oauth2.credentials import Credentials
 from dotenv import load_dotenv
-from email.mime.text import MIMEText
-import base64
 from flask import jsonify
-from google_search import perform_google_search
+from search import LOCAL_BACKENDS, get_backend
+from search_cache import search_cache
+from people_cache import PeopleSearchCache, normalize_schools
+from enrichment_cache import EnrichmentCache
+from linkedin_urls import linkedin_profile_key
+from concurrent.futures import ThreadPoolExecutor
+from http_client import http, async_http
+from background_loop import BackgroundLoop
+from rate_limiter import rate_limiter, QuotaExceeded
+from gmail_pool import GmailServicePool, build_gmail_service
+from gmail_messages import list_message_ids, fetch_messages, scan_contacts
+from gmail_sender import MAX_BULK_MESSAGES, build_raw_message, pacer_for, send_bulk
+from mailbox_index import MailboxIndex
+from send_queue import PermanentSendError, SendQueue
+from googleapiclient.errors import HttpError
+import atexit
 import logging
-import requests
 import json
-import urllib.parse
+import threading
+import time
+from datetime import datetime, timezone
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,27 +54,69 @@ SCOPES = [
 app = Flask(__name__)
 app.secret_key = "FLASK_SESSION_KEY"
 
+# Process-wide Firestore client, created on first use
+_firestore_client = None
+_firestore_lock = threading.Lock()
+
 def get_firestore_client():
-    # Set the credentials path for Firestore
-    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = FIRESTORE_CREDENTIALS_PATH
-    return firestore.Client()
+    global _firestore_client
+    if _firestore_client is None:
+        with _firestore_lock:
+            if _firestore_client is None:
+                # Set the credentials path for Firestore
+                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = FIRESTORE_CREDENTIALS_PATH
+                _firestore_client = firestore.Client()
+    return _firestore_client
 
 from google.auth.transport.requests import Request
 
+# Per-user OAuth credentials, kept in memory until the access token expires
+CREDENTIAL_CACHE_TTL = int(os.getenv('CREDENTIAL_CACHE_TTL', 300))  # Used when no token_expiry is known
+CREDENTIAL_EXPIRY_MARGIN = 60  # Drop cached credentials this many seconds before the token expires
+_credentials_cache = {}
+_credentials_lock = threading.Lock()
+
+# Gmail service objects per user, built from a discovery document parsed once
+gmail_pool = GmailServicePool(max_users=int(os.getenv('GMAIL_POOL_USERS', 256)))
+
+# Local per-user mailbox index kept current through Gmail history deltas
+mailbox_index = MailboxIndex.from_env()
+
+def _cache_credentials(user_id, creds):
+    if creds.expiry:
+        # google-auth keeps expiry as a naive UTC datetime
+        expires_at = creds.expiry.replace(tzinfo=timezone.utc).timestamp() - CREDENTIAL_EXPIRY_MARGIN
+    else:
+        expires_at = time.time() + CREDENTIAL_CACHE_TTL
+    with _credentials_lock:
+        _credentials_cache[user_id] = (creds, expires_at)
+
+def invalidate_user_credentials(user_id):
+    """Forget cached credentials, e.g. after the user re-authorizes"""
+    with _credentials_lock:
+        _credentials_cache.pop(user_id, None)
+
 def get_user_credentials(user_id):
+    with _credentials_lock:
+        cached = _credentials_cache.get(user_id)
+    if cached and cached[1] > time.time() and cached[0].valid:
+        return cached[0]
+
     db = get_firestore_client()
     doc = db.collection("users").document(user_id).get()
     if not doc.exists:
         return None
 
     data = doc.to_dict()
+    expiry = data.get('token_expiry')
     creds = Credentials(
         token=data['access_token'],
         refresh_token=data['refresh_token'],
         token_uri='https://oauth2.googleapis.com/token',
         client_id=os.environ.get('GOOGLE_CLIENT_ID'),
         client_secret=os.environ.get('GOOGLE_CLIENT_SECRET'),
-        scopes=SCOPES
+        scopes=SCOPES,
+        expiry=datetime.fromisoformat(expiry).replace(tzinfo=None) if expiry else None
     )
 
     if creds.expired and creds.refresh_token:
@@ -73,8 +128,29 @@ def get_user_credentials(user_id):
             "token_expiry": creds.expiry.isoformat()
         })
 
+    _cache_credentials(user_id, creds)
     return creds
 
+def send_queued_email(job):
+    """Send one queued job; called from the send queue's worker threads"""
+    creds = get_user_credentials(job['user_id'])
+    if creds is None:
+        raise PermanentSendError("No credentials found for this user")
+    raw_message = build_raw_message(job['recipient'], job['subject'], job['body'])
+    pacer_for(job['user_id']).wait()
+    try:
+        with gmail_pool.service(job['user_id'], creds) as service:
+            return service.users().messages().send(userId='me', body={'raw': raw_message}).execute()['id']
+    except HttpError as e:
+        # Malformed messages and bad recipients fail the same way on every attempt
+        if e.resp.status == 400:
+            raise PermanentSendError(str(e))
+        raise
+
+# Durable outreach queue; /send_email/queue returns a job id and workers send in the background
+send_queue = SendQueue.from_env()
+send_queue.start(send_queued_email)
+
 
 
 @app.route('/')
@@ -119,7 +195,7 @@ def oauth2callback():
     refresh_token = credentials.refresh_token
     token_expiry = credentials.expiry.isoformat()
 
-    service = build('gmail', 'v1', credentials=credentials)
+    service = build_gmail_service(credentials)
     profile = service.users().getProfile(userId='me').execute()
     email = profile['emailAddress']
 
@@ -136,6 +212,8 @@ def oauth2callback():
         "refresh_token": refresh_token,
         "token_expiry": token_expiry
     })
+    invalidate_user_credentials(user_id)
+    gmail_pool.invalidate(user_id)
 
     # Return a form with two text fields
     return render_template_string('''
@@ -209,22 +287,76 @@ def send_email():
     if creds is None:
         return {"error": "❌ No credentials found for this user"}, 403
 
-    service = build('gmail', 'v1', credentials=creds)
-    message = MIMEText(body)
-    message['to'] = to_email
-    message['subject'] = subject
-
-    raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-    send_result = service.users().messages().send(userId='me', body={'raw': raw_message}).execute()
+    raw_message = build_raw_message(to_email, subject, body)
+    # Shares the per-user pace with /send_emails so single sends can't push a bulk run over quota
+    pacer_for(username).wait()
+    with gmail_pool.service(username, creds) as service:
+        send_result = service.users().messages().send(userId='me', body={'raw': raw_message}).execute()
 
     return {"status": "✅ Email sent successfully!", "id": send_result['id']}
 
 
+@app.route('/send_emails', methods=['POST'])
+def send_emails():
+    data = request.json
+    username = data.get('username')
+    messages = data.get('messages')
+    concurrency = data.get('concurrency')
+
+    if not username or not messages or not isinstance(messages, list):
+        return {"error": "Missing username or list of messages"}, 400
+    if len(messages) > MAX_BULK_MESSAGES:
+        return {"error": f"At most {MAX_BULK_MESSAGES} messages per request"}, 400
+
+    # Resolved once for the whole batch; every send worker shares these credentials
+    creds = get_user_credentials(username)
+    if creds is None:
+        return {"error": "❌ No credentials found for this user"}, 403
+
+    results = send_bulk(gmail_pool, username, creds, messages, int(concurrency) if concurrency else None)
+    sent = sum(1 for result in results if result['status'] == 'sent')
+    return {'results': results, 'sent': sent, 'failed': len(results) - sent}
+
+
+@app.route('/send_email/queue', methods=['POST'])
+def queue_email():
+    data = request.json
+    username = data.get('username')
+    to_email = data.get('to')
+    subject = data.get('subject')
+    body = data.get('body')
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+    if not all([username, to_email, subject, body]):
+        return {"error": "Missing one of: username, to, subject, body"}, 400
+
+    if get_user_credentials(username) is None:
+        return {"error": "❌ No credentials found for this user"}, 403
+
+    job, created = send_queue.submit(username, to_email, subject, body, idempotency_key)
+    return {"job_id": job['id'], "status": job['status'], "duplicate": not created}, 202 if created else 200
+
+
+@app.route('/send_email/jobs/<job_id>')
+def send_job_status(job_id):
+    job = send_queue.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}, 404
+    return job
+
+
 @app.route('/read_with', methods=['POST'])
 def read_with():
     data = request.json
     username = data.get('username')
     target_email = data.get('email')
+    try:
+        limit = int_param(data, 'limit', 10, 1, 100)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    page_token = data.get('page_token')
+    include_body = data.get('include_body', True)
+    live = data.get('live', False) or bool(page_token)
 
     if not username or not target_email:
         return {"error": "Missing username or target email"}, 400
@@ -233,54 +365,61 @@ def read_with():
     if creds is None:
         return {"error": "❌ No credentials found for this user"}, 403
 
-    service = build('gmail', 'v1', credentials=creds)
-    query = f'to:{target_email} OR from:{target_email}'
-    results = service.users().messages().list(userId='me', q=query, maxResults=10).execute()
-    messages = results.get('messages', [])
-
-    email_data = []
-    for msg in messages:
-        msg_detail = service.users().messages().get(userId='me', id=msg['id'], format='full').execute()
-        headers = msg_detail.get('payload', {}).get('headers', [])
-
-        def get_header(name):
-            return next((h['value'] for h in headers if h['name'].lower() == name.lower()), "")
-
-        subject = get_header('Subject')
-        sender = get_header('From')
-        recipient = get_header('To')
-        cc = get_header('Cc')
-        bcc = get_header('Bcc')
-        date = get_header('Date')
-
-        body = ''
-        payload = msg_detail.get('payload', {})
-        parts = payload.get('parts', [])
-
-        if parts:
-            for part in parts:
-                if part['mimeType'] == 'text/plain' and 'data' in part['body']:
-                    body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='ignore')
-                    break
-                elif part['mimeType'] == 'text/html' and 'data' in part['body']:
-                    body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='ignore')
-        elif 'data' in payload.get('body', {}):
-            body = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8', errors='ignore')
-
-        email_data.append({
-            'from': sender,
-            'to': recipient,
-            'cc': cc,
-            'bcc': bcc,
-            'date': date,
-            'subject': subject,
-            'body': body[:500]
-        })
+    if not live:
+        # Answer from the local index after syncing only what changed since the last call
+        with gmail_pool.service(username, creds) as service:
+            email_data = mailbox_index.read_with(service, username, target_email, limit, include_body)
+        return {'emails': email_data, 'next_page_token': None, 'source': 'index'}
+
+    with gmail_pool.service(username, creds) as service:
+        query = f'to:{target_email} OR from:{target_email}'
+        message_ids, next_page_token = list_message_ids(service, query, limit, page_token)
+
+        # One batch request for all messages; headers only unless bodies are wanted
+        email_data = fetch_messages(service, message_ids, include_body=include_body)
+
+    return {'emails': email_data, 'next_page_token': next_page_token, 'source': 'gmail'}
 
-    return {'emails': email_data}
+@app.route('/read_with_many', methods=['POST'])
+def read_with_many():
+    data = request.json
+    username = data.get('username')
+    target_emails = data.get('emails')
+    try:
+        limit = int_param(data, 'limit', 10, 1, 100)  # Per contact
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    include_body = data.get('include_body', True)
+    live = data.get('live', False)
+
+    if not username or not target_emails or not isinstance(target_emails, list):
+        return {"error": "Missing username or list of target emails"}, 400
+    if len(target_emails) > 200:
+        return {"error": "At most 200 emails per request"}, 400
+
+    creds = get_user_credentials(username)
+    if creds is None:
+        return {"error": "❌ No credentials found for this user"}, 403
+
+    with gmail_pool.service(username, creds) as service:
+        if live:
+            # Chunked OR queries over all contacts; each message is fetched once
+            _, contacts = scan_contacts(service, target_emails, limit, include_body=include_body)
+            source = 'gmail'
+        else:
+            contacts = mailbox_index.read_with_many(service, username, target_emails, limit, include_body)
+            source = 'index'
+
+    return {'contacts': contacts, 'source': source}
+
+# Searches run on one long-lived event loop rather than a new loop per request, so the
+# dorks backend's aiohttp session persists and its background dork generation can
+# finish and fill the memo after the request returns
+search_loop = BackgroundLoop(name="search-loop")
+atexit.register(lambda: search_loop.run(async_http.close(), timeout=5))
 
 @app.route('/google_search', methods=['POST'])
-async def google_search_endpoint():
+def google_search_endpoint():
     try:
         data = request.json
         if not data:
@@ -292,14 +431,22 @@ async def google_search_endpoint():
             logger.error("Missing search query")
             return jsonify({"error": "Missing search query"}), 400
         
+        # In-process backends only, so a remote caller can never make this route call itself
+        backend_name = data.get('backend', 'custom_search')
+        if backend_name not in LOCAL_BACKENDS:
+            return jsonify({"error": f"backend must be one of {', '.join(LOCAL_BACKENDS)}"}), 400
+        
         logger.info(f"Performing search with query: {search_query}")
-        results = await perform_google_search(search_query)
+        num_results = int(data['num_results']) if data.get('num_results') else None
+        results = search_loop.run(get_backend(backend_name).search(search_query, num_results))
         logger.info(f"Search completed. Found {len(results)} results")
         
         return jsonify({
             "status": "success",
             "results": results
         })
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
     except Exception as e:
         logger.error(f"Error in google_search endpoint: {str(e)}", exc_info=True)
         return jsonify({
@@ -307,10 +454,81 @@ async def google_search_endpoint():
             "message": str(e)
         }), 500
 
+def quota_exceeded_response(e):
+    """429 with Retry-After for calls refused by the shared rate limiter"""
+    logger.warning(str(e))
+    response = jsonify({"status": "error", "error": str(e), "api": e.api, "reason": e.reason})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(int(e.retry_after) + 1)
+    return response
+
+def int_param(data, name, default, minimum, maximum):
+    """Optional integer field of a JSON body, clamped to [minimum, maximum]; ValueError if it is not an integer"""
+    value = data.get(name)
+    if value is None:
+        return default
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    return max(minimum, min(value, maximum))
+
 @app.route("/health")
 def health():
     return jsonify({"status": "healthy"}), 200
 
+@app.route("/search_cache/stats")
+def search_cache_stats():
+    return jsonify(search_cache.stats()), 200
+
+@app.route("/http/stats")
+def http_stats():
+    return jsonify(http.stats()), 200
+
+@app.route("/gmail_pool/stats")
+def gmail_pool_stats():
+    return jsonify(gmail_pool.stats()), 200
+
+@app.route("/send_queue/stats")
+def send_queue_stats():
+    return jsonify(send_queue.stats()), 200
+
+@app.route("/people_cache/stats")
+def people_cache_stats():
+    return jsonify(people_cache.stats()), 200
+
+# Linkd people searches, keyed by (normalized query, limit, sorted schools)
+people_cache = PeopleSearchCache.from_env()
+
+class LinkdError(Exception):
+    def __init__(self, status_code, details):
+        super().__init__(f"Linkd API returned {status_code}")
+        self.status_code = status_code
+        self.details = details
+
+def fetch_linkd_people(query, limit, schools):
+    """Call the Linkd search API; error responses raise LinkdError and are never cached"""
+    url = "https://search.linkd.inc/api/search/users"
+    headers = {
+        "Authorization": f"Bearer {LINKD_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    params = {
+        "query": query,
+        "limit": limit
+    }
+
+    if schools:
+        params["school"] = schools
+
+    rate_limiter.acquire("linkd")
+    response = http.get(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise LinkdError(response.status_code, response.text)
+    return response.json()
+
 @app.route("/search_people", methods=['POST'])
 def search_people():
     try:
@@ -322,44 +540,94 @@ def search_people():
         data = request.json
         query = data.get('query')
         limit = data.get('limit', 10)  # Default to 10 results
-        schools = data.get('schools', [])  # Optional school filter
         
         if not query:
             logger.error("Missing search query")
             return jsonify({"error": "Search query is required"}), 400
+
+        # Optional school filter, normalized once so the cache key matches the request sent to Linkd
+        try:
+            schools = normalize_schools(data.get('schools'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
             
-        # Prepare request to Linkd API
-        url = "https://search.linkd.inc/api/search/users"
-        headers = {
-            "Authorization": f"Bearer {LINKD_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        params = {
-            "query": query,
-            "limit": min(limit, 30)  # API limit is 30
-        }
-        
-        if schools:
-            params["school"] = schools
-            
-        # Make request to Linkd API
-        response = requests.get(url, headers=headers, params=params)
-        
-        if response.status_code != 200:
-            logger.error(f"Linkd API error: {response.text}")
-            return jsonify({
-                "error": "Failed to fetch results from Linkd API",
-                "status_code": response.status_code,
-                "details": response.text
-            }), response.status_code
-            
-        # Return the API response
-        return jsonify(response.json())
-        
+        limit = min(limit, 30)  # API limit is 30
+
+        # Served from cache when possible; stale entries are refreshed in the background
+        result, cache_status, age = people_cache.lookup(
+            query, limit, schools, lambda: fetch_linkd_people(query, limit, schools)
+        )
+        response = jsonify(result)
+        response.headers['X-Cache'] = cache_status
+        response.headers['Age'] = str(age)
+        return response
+
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
+    except LinkdError as e:
+        logger.error(f"Linkd API error: {e.details}")
+        return jsonify({
+            "error": "Failed to fetch results from Linkd API",
+            "status_code": e.status_code,
+            "details": e.details
+        }), e.status_code
     except Exception as e:
         logger.error(f"Error in search_people: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Apollo lookups keyed by canonical LinkedIn URL, including "not found" answers
+apollo_cache = EnrichmentCache.from_env()
+APOLLO_CONCURRENCY = int(os.getenv('APOLLO_CONCURRENCY', 4))
+MAX_BULK_PROFILES = 200
+
+class ApolloError(Exception):
+    def __init__(self, status_code, details):
+        super().__init__(f"Apollo API returned {status_code}")
+        self.status_code = status_code
+        self.details = details
+
+def fetch_apollo_email(first_name, last_name, linkedin_url):
+    """One Apollo people/match call; returns the email or None, raises ApolloError on API errors"""
+    url = "https://api.apollo.io/api/v1/people/match"
+    params = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "linkedin_url": linkedin_url,
+        "reveal_personal_emails": "true",
+        "reveal_phone_number": "false"
+    }
+    headers = {
+        "accept": "application/json",
+        "Cache-Control": "no-cache",
+        "Content-Type": "application/json",
+        "x-api-key": os.getenv("APOLLO_API_KEY")
+    }
+
+    rate_limiter.acquire("apollo")
+    response = http.post(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise ApolloError(response.status_code, response.text)
+    return (response.json().get("person") or {}).get("email")
+
+def resolve_email(first_name, last_name, linkedin_url):
+    """Return (email, cached), consulting the enrichment cache before spending an Apollo credit"""
+    # The canonical form is only the cache key; Apollo gets the URL as given
+    key = linkedin_profile_key(linkedin_url) or linkedin_url.strip()
+    hit, email = apollo_cache.get(key)
+    if hit:
+        return email, True
+    email = fetch_apollo_email(first_name, last_name, linkedin_url.strip())
+    apollo_cache.set(key, email)
+    return email, False
+
+@app.route("/rate_limits/stats")
+def rate_limits_stats():
+    return jsonify(rate_limiter.stats()), 200
+
+@app.route("/apollo_cache/stats")
+def apollo_cache_stats():
+    return jsonify(apollo_cache.stats()), 200
+
 @app.route('/get_email', methods=['POST'])
 def get_email():
     try:
@@ -372,37 +640,105 @@ def get_email():
         if not first_name or not last_name or not linkedin_url:
             return jsonify({"error": "Missing required fields: first_name, last_name, linkedin_url"}), 400
 
-        encoded_profile = urllib.parse.quote(linkedin_url, safe='')
-        url = (f"https://api.apollo.io/api/v1/people/match?first_name={first_name}"
-               f"&last_name={last_name}&linkedin_url={encoded_profile}&"
-               "reveal_personal_emails=true&reveal_phone_number=false")
-
-        headers = {
-            "accept": "application/json",
-            "Cache-Control": "no-cache",
-            "Content-Type": "application/json",
-            "x-api-key": os.getenv("APOLLO_API_KEY")
-        }
-
-        response = requests.post(url, headers=headers)
-        if response.status_code != 200:
-            logger.error(f"Apollo API error: {response.text}")
-            return jsonify({
-                "error": "Failed to fetch email from Apollo API",
-                "status_code": response.status_code,
-                "details": response.text
-            }), response.status_code
-
-        # Parse and return only the email
-        result = response.json()
-        email = result.get("person", {}).get("email")
+        email, cached = resolve_email(first_name, last_name, linkedin_url)
         if not email:
-            return jsonify({"error": "Email not found"}), 404
-        return jsonify({"email": email})
+            response = jsonify({"error": "Email not found"})
+            response.status_code = 404
+        else:
+            response = jsonify({"email": email})
+        response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+        return response
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
+    except ApolloError as e:
+        logger.error(f"Apollo API error: {e.details}")
+        return jsonify({
+            "error": "Failed to fetch email from Apollo API",
+            "status_code": e.status_code,
+            "details": e.details
+        }), e.status_code
     except Exception as e:
         logger.error(f"Error in get_email: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/get_emails', methods=['POST'])
+def get_emails():
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "No JSON data received"}), 400
+        profiles = data.get("profiles")
+        if not profiles or not isinstance(profiles, list):
+            return jsonify({"error": "Missing list of profiles"}), 400
+        if len(profiles) > MAX_BULK_PROFILES:
+            return jsonify({"error": f"At most {MAX_BULK_PROFILES} profiles per request"}), 400
+        for index, profile in enumerate(profiles):
+            if not isinstance(profile, dict):
+                return jsonify({"error": f"profiles[{index}] must be an object"}), 400
+            for field in ("first_name", "last_name", "linkedin_url"):
+                if profile.get(field) is not None and not isinstance(profile[field], str):
+                    return jsonify({"error": f"profiles[{index}].{field} must be a string"}), 400
+        try:
+            concurrency = int_param(data, "concurrency", APOLLO_CONCURRENCY, 1, APOLLO_CONCURRENCY)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Dedupe on canonical URL so each person costs at most one lookup
+        unique = {}
+        results = []
+        keys = []
+        for profile in profiles:
+            linkedin_url = profile.get("linkedin_url")
+            key = linkedin_profile_key(linkedin_url) if linkedin_url else None
+            if not key or not profile.get("first_name") or not profile.get("last_name"):
+                results.append({"linkedin_url": linkedin_url, "status": "invalid",
+                                "error": "Missing first_name, last_name or a LinkedIn profile URL"})
+                keys.append(None)
+                continue
+            unique.setdefault(key, profile)
+            results.append({"linkedin_url": linkedin_url})
+            keys.append(key)
+
+        resolved = {}
+        misses = []
+        for key, profile in unique.items():
+            hit, email = apollo_cache.get(key)
+            if hit:
+                resolved[key] = {"email": email, "status": "found" if email else "not_found", "cached": True}
+            else:
+                misses.append((key, profile))
+
+        def resolve(item):
+            key, profile = item
+            try:
+                email = fetch_apollo_email(profile["first_name"], profile["last_name"],
+                                           profile["linkedin_url"].strip())
+            except QuotaExceeded as e:
+                return key, {"email": None, "status": "rate_limited", "cached": False, "error": str(e)}
+            except Exception as e:
+                logger.error(f"Apollo lookup failed for {key}: {str(e)}")
+                return key, {"email": None, "status": "error", "cached": False, "error": str(e)}
+            apollo_cache.set(key, email)
+            return key, {"email": email, "status": "found" if email else "not_found", "cached": False}
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(misses))) as executor:
+                resolved.update(executor.map(resolve, misses))
+
+        for result, key in zip(results, keys):
+            if key is not None:
+                result.update(resolved[key])
+
+        return jsonify({
+            "results": results,
+            "unique_profiles": len(unique),
+            "cache_hits": len(unique) - len(misses),
+            "apollo_calls": len(misses)
+        })
+    except Exception as e:
+        logger.error(f"Error in get_emails: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 8080))
     host = os.getenv('HOST', '0.0.0.0')
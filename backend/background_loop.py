@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop:
+    """
+    A single asyncio event loop running forever in a daemon thread.
+
+    Sync code (Flask views) submits coroutines with `run()` instead of calling
+    `asyncio.run()` per request, so HTTP sessions, connection pools and other
+    loop-bound state survive across requests.
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule `coro` on the loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """Run `coro` on the loop and block the calling thread until it finishes"""
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, agen):
+        """Drive an async generator from sync code, yielding each item as it is produced"""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            self.run(agen.aclose())
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
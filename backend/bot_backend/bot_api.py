@@ -1,56 +1,71 @@
 from flask import Flask, request, jsonify
-import asyncio
+import atexit
 import os
 import sys
 from dotenv import load_dotenv
 import logging
-import requests
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Add the current directory to Python path
+# Add the current directory and the shared backend modules to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from linkedin_automation.connection_requester import main as start_bot
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from linkedin_automation.connection_requester import main as start_bot, launch_browser
+from linkedin_urls import linkedin_profile_key
+from search import BACKENDS, get_backend
+from background_loop import BackgroundLoop
+from browser_pool import BrowserPool
+from outreach_ledger import OutreachLedger
+from bot_jobs import BotJobs, JobsFull
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 
-async def perform_google_search(query: str):
-    """
-    Perform a Google search using the app.py endpoint
-    """
-    try:
-        # Get the app.py server URL from environment or use default
-        app_url = os.getenv('APP_URL', 'http://localhost:8080')
-        
-        # Make request to app.py's google_search endpoint
-        response = requests.post(
-            f"{app_url}/google_search",
-            json={"query": query},
-            headers={"Content-Type": "application/json"}
-        )
-        
-        if response.status_code != 200:
-            logger.error(f"Error from app.py: {response.text}")
-            return []
-            
-        data = response.json()
-        if data.get("status") == "success":
-            return data.get("results", [])
-        else:
-            logger.error(f"Error in search results: {data.get('message')}")
-            return []
-            
-    except Exception as e:
-        logger.error(f"Error performing Google search: {str(e)}")
-        return []
+# Bot runs execute on one long-lived event loop, so pooled Chrome processes
+# (bound to the loop that launched them) stay warm across requests
+bot_loop = BackgroundLoop(name="bot-loop")
+browser_pool = BrowserPool.from_env(launch_browser)
+if os.getenv('BOT_BROWSER_PREWARM', 'True').lower() == 'true':
+    bot_loop.submit(browser_pool.start())
+atexit.register(lambda: bot_loop.run(browser_pool.close(), timeout=30))
+
+# Per-account profile outcomes, so profiles already handled are never reopened
+outreach_ledger = OutreachLedger.from_env()
+DEFAULT_ACCOUNT = os.getenv('LINKEDIN_ACCOUNT', 'default')
+
+# Submitted runs execute in the background, at most one per pooled browser by default
+bot_jobs = BotJobs.from_env(bot_loop, default_running=browser_pool.size)
+
+async def run_bot_job(progress, search_query: str, message: str, workers: int, account: str,
+                      search_backend: str = None):
+    """Search for profiles and run the bot on them; the body of one background job"""
+    # In-process search (SEARCH_BACKEND=remote goes through app.py instead)
+    results = await get_backend(search_backend).search(search_query)
+    # Only profile pages are worth opening, whatever the backend turned up
+    search_results = [result for result in results if linkedin_profile_key(result['link'])]
+    if not search_results:
+        raise ValueError("No LinkedIn profiles found matching your search criteria")
+    
+    logger.info(f"Found {len(search_results)} LinkedIn profiles")
+    
+    outcome = await start_bot(
+        search_query=search_query, base_message=message, search_results=search_results,
+        workers=workers, browser_pool=browser_pool, ledger=outreach_ledger, account=account,
+        progress=progress
+    )
+    return {
+        "profiles_found": len(search_results),
+        "results": (outcome or {}).get("results", []),
+        "skipped": (outcome or {}).get("skipped", []),
+        "summary": (outcome or {}).get("summary", {})
+    }
 
 @app.route('/start_bot', methods=['POST'])
-async def start_bot_endpoint():
+def start_bot_endpoint():
     try:
         data = request.json
         if not data:
@@ -59,35 +74,36 @@ async def start_bot_endpoint():
             
         search_query = data.get('query')
         message = data.get('message')
+        workers = data.get('workers')  # Parallel browser contexts (defaults to LINKEDIN_PROFILE_WORKERS)
+        account = data.get('account') or DEFAULT_ACCOUNT  # LinkedIn account the ledger is kept for
+        search_backend = data.get('search_backend')  # Defaults to SEARCH_BACKEND
         
         if not search_query or not message:
             logger.error("Missing required parameters")
             return jsonify({
                 "error": "Missing required parameters: query and message"
             }), 400
+        if search_backend is not None and search_backend not in BACKENDS:
+            return jsonify({"error": f"search_backend must be one of {', '.join(BACKENDS)}"}), 400
         
         logger.info(f"Starting bot with query: {search_query}")
         logger.info(f"Using message: {message}")
         
-        # First perform the Google search using app.py
-        search_results = await perform_google_search(search_query)
-        if not search_results:
-            return jsonify({
-                "status": "error",
-                "message": "No LinkedIn profiles found matching your search criteria"
-            }), 404
-            
-        logger.info(f"Found {len(search_results)} LinkedIn profiles")
-        
-        # Start the bot with the search results
-        await start_bot(search_query=search_query, base_message=message, search_results=search_results)
+        workers = int(workers) if workers else None
+        job = bot_jobs.submit(
+            lambda progress: run_bot_job(progress, search_query, message, workers, account, search_backend),
+            {"query": search_query, "workers": workers, "account": account, "search_backend": search_backend}
+        )
         
         return jsonify({
-            "status": "success",
-            "message": "Bot started successfully",
-            "profiles_found": len(search_results)
-        })
+            "status": "accepted",
+            "message": "Bot job queued",
+            "job_id": job["id"],
+            "status_url": f"/jobs/{job['id']}"
+        }), 202
         
+    except JobsFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 429
     except Exception as e:
         logger.error(f"Error starting bot: {str(e)}", exc_info=True)
         return jsonify({
@@ -95,6 +111,32 @@ async def start_bot_endpoint():
             "message": str(e)
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = bot_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = bot_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+@app.route('/bot_jobs/stats', methods=['GET'])
+def bot_jobs_stats():
+    return jsonify(bot_jobs.stats()), 200
+
+@app.route('/browser_pool/stats', methods=['GET'])
+def browser_pool_stats():
+    return jsonify(browser_pool.stats()), 200
+
+@app.route('/outreach_ledger/stats', methods=['GET'])
+def outreach_ledger_stats():
+    return jsonify(outreach_ledger.stats(request.args.get('account'))), 200
+
 if __name__ == '__main__':
     port = int(os.getenv('BOT_API_PORT', 8000))
     host = os.getenv('BOT_API_HOST', '0.0.0.0')
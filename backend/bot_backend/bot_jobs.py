@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobsFull(Exception):
+    """Raised by submit when too many jobs are already waiting"""
+
+
+class BotJobs:
+    """
+    Registry of bot runs executing in the background on one event loop.
+
+    `submit` returns a job id immediately; at most `max_running` jobs run at
+    a time and the rest wait as "queued", up to `max_pending`. Each job is
+    handed a `progress` callback that it calls with a snapshot of its
+    per-profile counts. Finished jobs are kept for `retention` seconds so
+    clients can fetch their results. Reads happen on Flask threads while jobs
+    update from the loop thread, so all job state sits behind one lock.
+    """
+
+    def __init__(self, loop, max_running: int = 2, max_pending: int = 50, retention: float = 3600):
+        self.loop = loop
+        self.max_running = max(1, max_running)
+        self.max_pending = max_pending
+        self.retention = retention
+        self._slots = None  # asyncio.Semaphore, created on the loop thread
+        self._jobs = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    @classmethod
+    def from_env(cls, loop, default_running: int = 2) -> "BotJobs":
+        return cls(
+            loop,
+            max_running=int(os.getenv('BOT_MAX_RUNNING_JOBS', default_running)),
+            max_pending=int(os.getenv('BOT_MAX_PENDING_JOBS', 50)),
+            retention=float(os.getenv('BOT_JOB_RETENTION', 3600))
+        )
+
+    def submit(self, run: Callable, params: dict) -> dict:
+        """
+        Start `run(progress)` as a new job and return its snapshot.
+
+        `run` must return a coroutine; `params` is echoed back in the job so
+        clients can tell their submissions apart.
+        """
+        with self._lock:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if job["status"] == "queued")
+            if pending >= self.max_pending:
+                self._counters["rejected"] += 1
+                raise JobsFull(f"{pending} bot jobs are already waiting")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "params": params,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "progress": {},
+                "result": None,
+                "error": None
+            }
+            self._counters["submitted"] += 1
+            snapshot = self._snapshot(job_id)
+        self.loop.submit(self._execute(job_id, run))
+        return snapshot
+
+    async def _execute(self, job_id: str, run: Callable):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                return  # Cancelled before it got onto the loop
+            self._tasks[job_id] = asyncio.current_task()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        try:
+            async with self._slots:
+                with self._lock:
+                    job = self._jobs[job_id]
+                    if job["status"] == "queued":  # Not while a cancel is on its way
+                        job.update(status="running", started_at=time.time())
+                result = await run(lambda progress: self._update(job_id, progress=progress))
+        except asyncio.CancelledError:
+            self._finish(job_id, "cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Bot job {job_id} failed: {str(e)}", exc_info=True)
+            self._finish(job_id, "failed", error=str(e))
+        else:
+            self._finish(job_id, "completed", result=result)
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _finish(self, job_id: str, status: str, **fields):
+        with self._lock:
+            self._tasks.pop(job_id, None)
+            self._jobs[job_id].update(fields, status=status, finished_at=time.time())
+            self._counters[status] += 1
+
+    def _snapshot(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "progress": dict(job["progress"])}
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job["status"] in FINISHED_STATUSES and job["finished_at"] < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._snapshot(job_id)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Cancel a queued or running job and return its snapshot.
+
+        A started job moves to "cancelling" until its browser run unwinds at
+        the next await; profiles finished by then keep their outcomes.
+        Returns None for unknown ids.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            task = self._tasks.get(job_id)
+            if task is not None:
+                job["status"] = "cancelling"
+                self.loop.loop.call_soon_threadsafe(task.cancel)
+            elif job["status"] == "queued":
+                job.update(status="cancelled", finished_at=time.time())
+                self._counters["cancelled"] += 1
+            return self._snapshot(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+            return {**self._counters, "jobs": statuses, "max_running": self.max_running,
+                    "max_pending": self.max_pending}
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """
+    Long-lived pool of warm browser_use Browsers, one Chrome process each.
+
+    A bot run checks a browser out for its whole duration, opens fresh
+    contexts on it and closes them, then returns the browser instead of
+    closing it, so later runs skip Chrome's cold start. A browser whose
+    process died or disconnected is relaunched on checkout. All methods must
+    be called from the single event loop that owns the pool, because
+    Playwright objects are bound to the loop that created them.
+    """
+
+    def __init__(self, launcher: Callable, size: int = 2):
+        self.launcher = launcher
+        self.size = size
+        self._idle = None
+        self._all = []
+        self._started = False
+        self._counters = {"launches": 0, "launch_seconds": 0.0, "checkouts": 0, "reuses": 0,
+                          "reuse_seconds": 0.0, "restarts": 0}
+
+    @classmethod
+    def from_env(cls, launcher: Callable) -> "BrowserPool":
+        return cls(launcher, size=int(os.getenv('BOT_BROWSER_POOL_SIZE', 2)))
+
+    async def _launch(self):
+        started = time.monotonic()
+        browser = self.launcher()
+        # browser_use starts Chrome lazily; force it now so checkouts get a warm process
+        await browser.get_playwright_browser()
+        self._counters["launches"] += 1
+        self._counters["launch_seconds"] += time.monotonic() - started
+        return browser
+
+    async def start(self):
+        """Launch `size` browsers up front"""
+        if self._started:
+            return
+        self._started = True
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            try:
+                browser = await self._launch()
+            except Exception as e:
+                logger.error(f"Could not pre-launch browser: {str(e)}")
+                browser = None
+            else:
+                self._all.append(browser)
+            # A None slot is launched on first checkout
+            self._idle.put_nowait(browser)
+
+    async def _healthy(self, browser) -> bool:
+        try:
+            playwright_browser = await browser.get_playwright_browser()
+            return playwright_browser.is_connected()
+        except Exception:
+            return False
+
+    @asynccontextmanager
+    async def browser(self):
+        """Check out a healthy warm browser for one run"""
+        await self.start()
+        started = time.monotonic()
+        browser = await self._idle.get()
+        try:
+            if browser is not None and await self._healthy(browser):
+                self._counters["reuses"] += 1
+                self._counters["reuse_seconds"] += time.monotonic() - started
+            else:
+                if browser is not None:
+                    logger.warning("Pooled browser is unhealthy, restarting it")
+                    self._counters["restarts"] += 1
+                    await self._discard(browser)
+                browser = await self._launch()
+                self._all.append(browser)
+        except BaseException:
+            self._idle.put_nowait(None)
+            raise
+        self._counters["checkouts"] += 1
+        try:
+            yield browser
+        finally:
+            self._idle.put_nowait(browser)
+
+    async def _discard(self, browser):
+        if browser in self._all:
+            self._all.remove(browser)
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser: {str(e)}")
+
+    async def close(self):
+        for browser in list(self._all):
+            if browser is not None:
+                await self._discard(browser)
+        self._all = []
+        self._started = False
+
+    def stats(self) -> dict:
+        stats = {key: round(value, 3) if isinstance(value, float) else value
+                 for key, value in self._counters.items()}
+        stats["size"] = self.size
+        stats["idle"] = self._idle.qsize() if self._idle is not None else 0
+        stats["avg_launch_ms"] = (round(1000 * self._counters["launch_seconds"] / self._counters["launches"], 1)
+                                  if self._counters["launches"] else None)
+        stats["avg_reuse_ms"] = (round(1000 * self._counters["reuse_seconds"] / self._counters["reuses"], 1)
+                                 if self._counters["reuses"] else None)
+        return stats
@@ -5,14 +5,66 @@ from dotenv import load_dotenv
 import os
 import sys
 
-# Add parent directory to Python path
+# Add parent directory and the shared backend modules to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 import re
+import time
 from playwright.async_api import BrowserContext
+from linkedin_urls import linkedin_profile_key
+from request_policy import RequestPolicy
 
 load_dotenv()
 
+# Isolated browser contexts working through profiles in parallel
+PROFILE_WORKERS = int(os.getenv('LINKEDIN_PROFILE_WORKERS', 3))
+# Profiles handed to one agent task; short tasks keep the LLM context small
+PROFILES_PER_TASK = int(os.getenv('LINKEDIN_PROFILES_PER_TASK', 5))
+# Seconds a worker pauses between its tasks (workers also start this far apart)
+PROFILE_PACING_SECONDS = float(os.getenv('LINKEDIN_PACING_SECONDS', 5))
+# Run Chrome without a window
+HEADLESS = os.getenv('LINKEDIN_HEADLESS', 'False').lower() == 'true'
+# Lean page loads: skip images, fonts, media, third-party and tracking requests
+request_policy = RequestPolicy.from_env()
+
+# Labels the agent reports per profile, and the outcome each one is recorded as
+AGENT_LABELS = {
+    'SENT': 'sent',
+    'PENDING': 'sent',
+    'CONNECTED': 'connected',
+    'EMAIL_GATED': 'email_gated',
+    'FOLLOW_ONLY': 'follow_only',
+    'ERROR': 'error'
+}
+OUTCOMES = ('sent', 'connected', 'email_gated', 'follow_only', 'error', 'unknown')
+# A whole label: hyphens count as part of a word, so "NON-ERROR" is not an ERROR
+_LABEL_PATTERN = re.compile(r'(?<![\w-])(' + '|'.join(AGENT_LABELS) + r')(?![\w-])')
+_PROFILE_URL_PATTERN = re.compile(r'\S*linkedin\.com/\S+', re.IGNORECASE)
+
+def parse_agent_result(result_text: str, profile_urls: list) -> dict:
+    """
+    Map each profile URL to an outcome (see OUTCOMES) from the agent's final answer.
+
+    The agent is asked for one "<url>: <LABEL>" line per profile; URLs are
+    compared in canonical form so small spelling changes by the LLM still match.
+    The label is looked for outside the URLs, since slugs like
+    "sam-connected-lee" contain label words. Profiles the agent did not
+    report on are "unknown".
+    """
+    wanted = {linkedin_profile_key(url) or url: url for url in profile_urls}
+    outcomes = {url: 'unknown' for url in profile_urls}
+    for line in result_text.splitlines():
+        candidates = _PROFILE_URL_PATTERN.findall(line)
+        label = _LABEL_PATTERN.search(_PROFILE_URL_PATTERN.sub(' ', line).upper())
+        if label is None:
+            continue
+        for candidate in candidates:
+            url = wanted.get(linkedin_profile_key(candidate.strip('.,;:()[]"\'')))
+            if url:
+                outcomes[url] = AGENT_LABELS[label.group(1)]
+    return outcomes
+
 async def connect_to_profile(browser_context: BrowserContext, profile_urls: list, base_message: str):
     """Helper function to handle connecting to multiple profiles"""
     try:
@@ -39,7 +91,14 @@ async def connect_to_profile(browser_context: BrowserContext, profile_urls: list
                       - Click 'Send'
                       - Wait for the connection request to be sent
                    f. Wait 5 seconds before moving to the next profile
-                2. Return "SUCCESS" for each successful connection, "SKIP" for each skipped profile, or "ERROR" if there was an error
+                2. Finish by returning exactly one line per profile URL, in the form "<profile URL>: LABEL",
+                   where LABEL is one of:
+                   - SENT if you sent a connection request
+                   - PENDING if a request was already pending
+                   - CONNECTED if we are already connected (1st degree)
+                   - EMAIL_GATED if connecting requires their email address
+                   - FOLLOW_ONLY if there is no Connect button, even under More
+                   - ERROR if the profile could not be processed
                 """,
             llm=ChatOpenAI(model="gpt-4o"),
             browser_context=browser_context
@@ -48,53 +107,144 @@ async def connect_to_profile(browser_context: BrowserContext, profile_urls: list
         # Run the agent and get the result
         result = await agent.run()
         
-        # Process results
-        success_count = 0
-        skip_count = 0
-        error_count = 0
-        
-        # Convert result to string if it's not already
-        result_str = str(result)
-        
-        # Process each line of the result
-        for line in result_str.split('\n'):
-            if "SUCCESS" in line:
-                success_count += 1
-            elif "SKIP" in line:
-                skip_count += 1
-            else:
-                error_count += 1
-        
-        print(f"\nConnection Summary:")
-        print(f"Successfully connected: {success_count}")
-        print(f"Skipped profiles: {skip_count}")
-        print(f"Errors: {error_count}")
-        
-        return success_count > 0
+        # Prefer the agent's final answer over the full step history
+        final_result = result.final_result() if hasattr(result, 'final_result') else None
+        return parse_agent_result(str(final_result or result), profile_urls)
         
     except Exception as e:
         print(f"Error processing profiles: {str(e)}")
-        return False
+        return {url: 'error' for url in profile_urls}
+
+def shard_profiles(profile_urls: list, shard_size: int) -> list:
+    return [profile_urls[start:start + shard_size] for start in range(0, len(profile_urls), shard_size)]
+
+def count_outcomes(results: dict) -> dict:
+    counts = {outcome: 0 for outcome in OUTCOMES}
+    for outcome in results.values():
+        counts[outcome] += 1
+    return counts
+
+async def process_profiles(browser, search_results, base_message, workers: int = None,
+                           shard_size: int = None, pacing: float = None, ledger=None, account: str = 'default',
+                           progress=None):
+    """
+    Connect to every profile using a pool of isolated browser contexts.
 
-async def process_profiles(browser, search_results, base_message):
-    """Process all profiles at once"""
-    # Create a persistent browser context
-    context = await browser.new_context()
+    With a `ledger`, profiles that already have a terminal outcome for
+    `account` are dropped in one lookup before any page is opened, and every
+    new outcome is recorded afterwards. The remaining URLs are split into
+    shards of `shard_size`, and each shard runs as its own short agent task.
+    Up to `workers` contexts pull shards from a shared queue. A worker waits
+    `pacing` seconds between tasks, and workers start that far apart, so
+    requests are spread out. Every context loads pages under `request_policy`,
+    and the run's request and byte counts are reported in the summary as
+    `traffic`. `progress`, if given, is called with the per-outcome counts so
+    far after every task. Returns per-profile outcomes plus a summary.
+    """
+    workers = max(1, workers or PROFILE_WORKERS)
+    shard_size = max(1, shard_size or PROFILES_PER_TASK)
+    pacing = PROFILE_PACING_SECONDS if pacing is None else pacing
+    
+    # One entry per profile: the canonical key dedupes and keys the ledger, while
+    # the browser opens the first link found for it, as given
+    profiles = {}
+    for result in search_results:
+        profiles.setdefault(linkedin_profile_key(result['link']) or result['link'], result['link'])
+    known = ledger.known_terminal(account, list(profiles)) if ledger is not None else {}
+    if known:
+        print(f"Skipping {len(known)} profiles already handled for account {account}")
+    profile_urls = [url for key, url in profiles.items() if key not in known]
+    key_of = {url: key for key, url in profiles.items()}
+    shards = shard_profiles(profile_urls, shard_size)
+    workers = min(workers, len(shards)) or 1
+    print(f"\nProcessing {len(profile_urls)} profiles in {len(shards)} tasks across {workers} browser contexts")
+    
+    queue = asyncio.Queue()
+    for shard in shards:
+        queue.put_nowait(shard)
+    results = {}
+    traffic = request_policy.new_counters()
+    started = time.monotonic()
+    
+    def report():
+        if progress is not None:
+            progress({'total': len(profile_urls), 'done': len(results), 'already_handled': len(known),
+                      **count_outcomes(results)})
+    report()
+    
+    async def worker(worker_id):
+        await asyncio.sleep(worker_id * pacing)
+        try:
+            context = await browser.new_context()
+        except Exception as e:
+            # Its shards stay queued for the other workers
+            print(f"[context {worker_id}] Could not open a browser context: {str(e)}")
+            return
+        try:
+            await request_policy.apply(context, traffic)
+            while True:
+                try:
+                    shard = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                print(f"[context {worker_id}] Connecting to {len(shard)} profiles")
+                results.update(await connect_to_profile(context, shard, base_message))
+                report()
+                if not queue.empty():
+                    await asyncio.sleep(pacing)
+        finally:
+            await context.close()
+    
     try:
-        # Extract all profile URLs
-        profile_urls = [result['link'] for result in search_results]
-        print(f"\nProcessing {len(profile_urls)} profiles in batch")
-        
-        # Connect to all profiles using the persistent context
-        success = await connect_to_profile(context, profile_urls, base_message)
-        
-        if not success:
-            print("No successful connections were made")
-            
+        await asyncio.gather(*(worker(worker_id) for worker_id in range(workers)))
     finally:
-        await context.close()
+        # Also on cancellation, so finished profiles are not visited again
+        if ledger is not None:
+            ledger.record(account, {key_of[url]: outcome for url, outcome in results.items()})
+    
+    summary = count_outcomes(results)
+    summary['already_handled'] = len(known)
+    summary['elapsed_seconds'] = round(time.monotonic() - started, 1)
+    summary['traffic'] = traffic
+    
+    print(f"\nConnection Summary:")
+    print(f"Requests sent: {summary['sent']}")
+    print(f"Already connected: {summary['connected']}")
+    print(f"Email required: {summary['email_gated']}")
+    print(f"No connect button: {summary['follow_only']}")
+    print(f"Errors: {summary['error']}")
+    print(f"Unreported: {summary['unknown']}")
+    print(f"Skipped (already handled): {summary['already_handled']}")
+    print(f"Requests blocked: {traffic['requests_blocked']}, loaded: {traffic['requests_loaded']} "
+          f"({traffic['bytes_loaded'] / 1e6:.1f} MB)")
+    if not summary['sent']:
+        print("No connection requests were sent")
+    
+    return {
+        'results': [{'url': url, 'status': results.get(url, 'unknown')} for url in profile_urls],
+        'skipped': [{'url': profiles[key], 'status': outcome, 'updated_at': updated_at}
+                    for key, (outcome, updated_at) in known.items()],
+        'summary': summary
+    }
+
+def launch_browser():
+    """Configure a Chrome-backed browser_use Browser (Chrome itself starts on first use)"""
+    return Browser(
+        config=BrowserConfig(
+            browser_binary_path=os.getenv('CHROME_BINARY_PATH', '/usr/bin/google-chrome'),
+            headless=HEADLESS,
+            reuse_browser=True
+        )
+    )
 
-async def main(search_query: str = None, base_message: str = None, search_results: list = None):
+async def main(search_query: str = None, base_message: str = None, search_results: list = None,
+               workers: int = None, browser_pool=None, ledger=None, account: str = 'default', progress=None):
+    """
+    Run one connection campaign.
+
+    With a `browser_pool` (the bot service) a warm browser is borrowed and
+    returned; without one (CLI use) a browser is launched and closed here.
+    """
     print("\nLinkedIn Profile Connection Automation")
     print("This will help you connect with people on LinkedIn based on your search criteria\n")
     
@@ -122,17 +272,28 @@ async def main(search_query: str = None, base_message: str = None, search_result
             
         print(f"\nFound {len(search_results)} LinkedIn profiles")
         
+        if browser_pool is not None:
+            started = time.monotonic()
+            async with browser_pool.browser() as pooled_browser:
+                ready_ms = int((time.monotonic() - started) * 1000)
+                print(f"Browser ready in {ready_ms} ms")
+                outcome = await process_profiles(pooled_browser, search_results, base_message, workers=workers,
+                                                 ledger=ledger, account=account, progress=progress)
+                outcome['summary']['browser_ready_ms'] = ready_ms
+                return outcome
+        
         # Configure browser
-        browser = Browser(
-            config=BrowserConfig(
-                browser_binary_path='/usr/bin/google-chrome',
-                headless=False,
-                reuse_browser=True
-            )
-        )
+        started = time.monotonic()
+        browser = launch_browser()
+        await browser.get_playwright_browser()
+        ready_ms = int((time.monotonic() - started) * 1000)
+        print(f"Browser launched in {ready_ms} ms")
         
-        # Process all profiles with persistent context
-        await process_profiles(browser, search_results, base_message)
+        # Process profiles in parallel browser contexts
+        outcome = await process_profiles(browser, search_results, base_message, workers=workers,
+                                         ledger=ledger, account=account, progress=progress)
+        outcome['summary']['browser_ready_ms'] = ready_ms
+        return outcome
             
     except Exception as e:
         print(f"\nAn error occurred: {str(e)}")
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Stored beside this module so every bot run sees the same ledger, wherever it was started
+DEFAULT_LEDGER_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outreach_ledger.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outreach (
+    account TEXT NOT NULL,
+    profile_url TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (account, profile_url)
+);
+"""
+
+# Outcomes after which visiting the profile again cannot change anything
+TERMINAL_OUTCOMES = ('sent', 'connected', 'email_gated', 'follow_only')
+
+# SQLite's default limit on bound parameters is 999
+_LOOKUP_CHUNK = 900
+
+
+class OutreachLedger:
+    """
+    Persistent per-account record of what happened on each LinkedIn profile.
+
+    Profiles with a terminal outcome (request sent, already connected,
+    invitation gated behind an email address, no Connect button) are
+    filtered out before a run opens any page. Errors are recorded but not
+    terminal, so those profiles are tried again next time. Profiles are keyed
+    by `linkedin_profile_key`.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "OutreachLedger":
+        return cls(os.getenv('OUTREACH_LEDGER_DB', DEFAULT_LEDGER_DB))
+
+    def known_terminal(self, account: str, profile_urls: List[str]) -> Dict[str, Tuple[str, float]]:
+        """Map each URL that already has a terminal outcome to (outcome, updated_at)"""
+        known = {}
+        placeholders = ', '.join('?' for _ in TERMINAL_OUTCOMES)
+        with self._lock:
+            for start in range(0, len(profile_urls), _LOOKUP_CHUNK):
+                chunk = profile_urls[start:start + _LOOKUP_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT profile_url, outcome, updated_at FROM outreach WHERE account = ? "
+                    f"AND profile_url IN ({', '.join('?' for _ in chunk)}) AND outcome IN ({placeholders})",
+                    (account, *chunk, *TERMINAL_OUTCOMES)
+                ).fetchall()
+                known.update((url, (outcome, updated_at)) for url, outcome, updated_at in rows)
+        return known
+
+    def record(self, account: str, outcomes: Dict[str, str]):
+        """Store the latest outcome per profile URL; unknown outcomes are not recorded"""
+        now = time.time()
+        rows = [(account, url, outcome, now, now) for url, outcome in outcomes.items() if outcome != 'unknown']
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO outreach (account, profile_url, outcome, first_seen, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (account, profile_url) DO UPDATE SET "
+                "outcome = excluded.outcome, attempts = attempts + 1, updated_at = excluded.updated_at",
+                rows
+            )
+            self._db.commit()
+
+    def stats(self, account: str = None) -> dict:
+        with self._lock:
+            if account:
+                rows = self._db.execute("SELECT outcome, COUNT(*) FROM outreach WHERE account = ? GROUP BY outcome",
+                                        (account,)).fetchall()
+            else:
+                rows = self._db.execute("SELECT outcome, COUNT(*) FROM outreach GROUP BY outcome").fetchall()
+            accounts = self._db.execute("SELECT COUNT(DISTINCT account) FROM outreach").fetchone()[0]
+        return {"outcomes": dict(rows), "accounts": accounts}
@@ -0,0 +1,113 @@
+import logging
+import os
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+# LinkedIn pages only need their own HTML/JS/API calls and the licdn.com static CDN
+DEFAULT_ALLOWED_DOMAINS = ('linkedin.com', 'licdn.com')
+# First-party hosts that only serve ads and analytics (Insight Tag, ad pixel)
+DEFAULT_BLOCKED_HOSTS = ('px.ads.linkedin.com', 'snap.licdn.com')
+
+
+def _csv(value: Optional[str], default: Iterable[str]) -> tuple:
+    if value is None:
+        return tuple(default)
+    return tuple(item.strip().lower() for item in value.split(',') if item.strip())
+
+
+def _matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class RequestPolicy:
+    """
+    Which requests a bot browser context may make.
+
+    The agent only needs a profile's action buttons and headline text, so
+    images, media and fonts are aborted, as are requests to any host outside
+    `allowed_domains` and to known tracking hosts. Top-level documents are
+    always let through so navigation itself never breaks. Counters are kept
+    per run in a dict from `new_counters()`.
+    """
+
+    def __init__(self, enabled: bool = True, blocked_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+                 allowed_domains: Iterable[str] = DEFAULT_ALLOWED_DOMAINS,
+                 blocked_hosts: Iterable[str] = DEFAULT_BLOCKED_HOSTS):
+        self.enabled = enabled
+        self.blocked_types = frozenset(blocked_types)
+        self.allowed_domains = tuple(allowed_domains)
+        self.blocked_hosts = tuple(blocked_hosts)
+
+    @classmethod
+    def from_env(cls) -> "RequestPolicy":
+        return cls(
+            enabled=os.getenv('LINKEDIN_LEAN_MODE', 'True').lower() == 'true',
+            blocked_types=_csv(os.getenv('LINKEDIN_BLOCK_RESOURCE_TYPES'), DEFAULT_BLOCKED_TYPES),
+            allowed_domains=_csv(os.getenv('LINKEDIN_ALLOWED_DOMAINS'), DEFAULT_ALLOWED_DOMAINS),
+            blocked_hosts=_csv(os.getenv('LINKEDIN_BLOCK_HOSTS'), DEFAULT_BLOCKED_HOSTS)
+        )
+
+    @staticmethod
+    def new_counters() -> dict:
+        return {"requests_loaded": 0, "requests_blocked": 0, "blocked_by_type": {}, "blocked_third_party": 0,
+                "blocked_tracking": 0, "bytes_loaded": 0}
+
+    def block_reason(self, resource_type: str, url: str) -> Optional[str]:
+        """Return why a request should be aborted ("type", "third_party", "tracking"), or None"""
+        if resource_type == 'document':
+            return None
+        host = (urlsplit(url).hostname or '').lower()
+        if not host:
+            return None  # data:, blob: and the like never hit the network
+        if _matches(host, self.blocked_hosts):
+            return 'tracking'
+        if resource_type in self.blocked_types:
+            return 'type'
+        if self.allowed_domains and not _matches(host, self.allowed_domains):
+            return 'third_party'
+        return None
+
+    async def apply(self, browser_context, counters: dict):
+        """
+        Install the policy on a browser_use BrowserContext, counting into `counters`.
+
+        Loaded requests and bytes are counted even when the policy is
+        disabled, so runs with and without lean mode can be compared.
+        """
+        try:
+            session = await browser_context.get_session()
+            playwright_context = session.context
+        except Exception as e:
+            logger.warning(f"Could not install request policy, loading pages in full: {str(e)}")
+            return
+
+        async def route(route, request):
+            reason = self.block_reason(request.resource_type, request.url)
+            if reason is None:
+                await route.continue_()
+                return
+            counters["requests_blocked"] += 1
+            if reason == 'type':
+                by_type = counters["blocked_by_type"]
+                by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+            else:
+                counters[f"blocked_{reason}"] += 1
+            await route.abort('blockedbyclient')
+
+        async def response(response):
+            # Blocked requests never download, so their size is unknown; count what did load
+            counters["requests_loaded"] += 1
+            try:
+                # Waits for the body to finish; covers chunked and compressed responses without content-length
+                sizes = await response.request.sizes()
+            except Exception as e:
+                logger.debug(f"No transfer size for {response.url}: {str(e)}")
+                return
+            counters["bytes_loaded"] += max(0, sizes["responseBodySize"]) + max(0, sizes["responseHeadersSize"])
+
+        playwright_context.on('response', response)
+        if self.enabled:
+            await playwright_context.route('**/*', route)
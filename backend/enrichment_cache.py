@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Next to this module, so app.py reuses its lookups whatever directory it runs from
+DEFAULT_CACHE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "apollo_cache.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS enrichment (
+    linkedin_url TEXT PRIMARY KEY,
+    email TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class EnrichmentCache:
+    """
+    Persistent cache of Apollo email lookups keyed by canonical LinkedIn URL.
+
+    Found emails are kept for `ttl` seconds. "No email" answers are cached
+    too, for the shorter `negative_ttl`, because Apollo may find the email
+    later and every lookup spends a credit. Failed API calls are never
+    cached.
+    """
+
+    def __init__(self, db_path: str = ":memory:", ttl: float = 30 * 86400, negative_ttl: float = 3 * 86400):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "negative_hits": 0, "misses": 0, "stored": 0, "stored_negative": 0}
+
+    @classmethod
+    def from_env(cls) -> "EnrichmentCache":
+        """Build a cache from APOLLO_CACHE_DB, APOLLO_CACHE_TTL and APOLLO_NEGATIVE_TTL"""
+        return cls(
+            db_path=os.getenv("APOLLO_CACHE_DB", DEFAULT_CACHE_DB),
+            ttl=float(os.getenv("APOLLO_CACHE_TTL", 30 * 86400)),
+            negative_ttl=float(os.getenv("APOLLO_NEGATIVE_TTL", 3 * 86400))
+        )
+
+    def get(self, linkedin_url: str) -> Tuple[bool, Optional[str]]:
+        """Return (hit, email); a hit with email None is a cached "not found" """
+        with self._lock:
+            row = self._db.execute("SELECT email, expires_at FROM enrichment WHERE linkedin_url = ?",
+                                   (linkedin_url,)).fetchone()
+            if row is None or row[1] <= time.time():
+                self._counters["misses"] += 1
+                return False, None
+            self._counters["hits" if row[0] else "negative_hits"] += 1
+            return True, row[0]
+
+    def set(self, linkedin_url: str, email: Optional[str]):
+        """Store a lookup result; email None records a negative answer"""
+        now = time.time()
+        ttl = self.ttl if email else self.negative_ttl
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO enrichment (linkedin_url, email, fetched_at, expires_at) "
+                             "VALUES (?, ?, ?, ?)", (linkedin_url, email, now, now + ttl))
+            self._db.commit()
+            self._counters["stored" if email else "stored_negative"] += 1
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM enrichment WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = self._db.execute("SELECT COUNT(*) FROM enrichment").fetchone()[0]
+            lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 4) if lookups else 0.0
+            return stats
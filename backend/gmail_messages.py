@@ -0,0 +1,213 @@
+import base64
+import logging
+from email.utils import getaddresses
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Headers returned for every message
+HEADER_NAMES = ['Subject', 'From', 'To', 'Cc', 'Bcc', 'Date']
+
+# Characters of body text returned per message
+BODY_CHAR_LIMIT = 500
+
+# Gmail allows up to 100 calls per batch but throttles large ones; 50 is the recommended size
+BATCH_SIZE = 50
+
+# Contacts combined into one `to:a OR from:a OR ...` search
+CONTACTS_PER_QUERY = 20
+
+# Gmail's maximum page size for messages.list
+LIST_PAGE_SIZE = 500
+
+# Only download the parts of a message that are actually used
+FULL_FIELDS = 'id,threadId,labelIds,internalDate,payload(mimeType,headers,body/data,parts)'
+METADATA_FIELDS = 'id,threadId,labelIds,internalDate,payload/headers'
+
+
+def _decode_prefix(data: str, max_chars: int) -> str:
+    """
+    Decode only as much of a base64url body as is needed for `max_chars`.
+
+    A UTF-8 character is at most 4 bytes, so 4 * max_chars bytes are always
+    enough; that is 4/3 as many base64 characters, rounded to a full quantum.
+    """
+    needed = -(-(max_chars * 4 * 4) // 3)
+    needed += -needed % 4
+    chunk = data[:needed]
+    chunk += '=' * (-len(chunk) % 4)
+    return base64.urlsafe_b64decode(chunk).decode('utf-8', errors='ignore')[:max_chars]
+
+
+def extract_body(payload: dict, max_chars: int = BODY_CHAR_LIMIT) -> str:
+    """
+    Return up to `max_chars` of a message body, preferring text/plain over text/html.
+
+    Walks nested multiparts depth-first and stops at the first text/plain part,
+    decoding only the prefix of it that fits within the cap.
+    """
+    html_data = None
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        mime_type = part.get('mimeType', '')
+        data = part.get('body', {}).get('data')
+        if data and mime_type == 'text/plain':
+            return _decode_prefix(data, max_chars)
+        if data and mime_type == 'text/html' and html_data is None:
+            html_data = data
+        elif data and not part.get('parts') and part is payload:
+            # Single-part message of another text type
+            html_data = html_data or data
+        # Push children reversed so they are visited in document order
+        stack.extend(reversed(part.get('parts', [])))
+    return _decode_prefix(html_data, max_chars) if html_data else ''
+
+
+def summarize_message(msg_detail: dict, include_body: bool = True) -> Dict[str, str]:
+    """Turn a Gmail message resource into the flat dict returned by the API"""
+    headers = msg_detail.get('payload', {}).get('headers', [])
+
+    def get_header(name):
+        return next((h['value'] for h in headers if h['name'].lower() == name.lower()), "")
+
+    summary = {
+        'id': msg_detail.get('id', ''),
+        'from': get_header('From'),
+        'to': get_header('To'),
+        'cc': get_header('Cc'),
+        'bcc': get_header('Bcc'),
+        'date': get_header('Date'),
+        'subject': get_header('Subject')
+    }
+    if include_body:
+        summary['body'] = extract_body(msg_detail.get('payload', {}))
+    return summary
+
+
+def _get_request(service, message_id: str, include_body: bool):
+    if include_body:
+        return service.users().messages().get(userId='me', id=message_id, format='full', fields=FULL_FIELDS)
+    return service.users().messages().get(userId='me', id=message_id, format='metadata',
+                                          metadataHeaders=HEADER_NAMES, fields=METADATA_FIELDS)
+
+
+def fetch_message_details(service, message_ids: List[str], include_body: bool = True) -> Dict[str, dict]:
+    """
+    Fetch many messages with Gmail batch requests.
+
+    Returns raw message resources keyed by id. Items that fail inside a batch
+    (typically per-user rate limits) are retried once individually.
+    """
+    details = {}
+    failed = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            failed.append(request_id)
+        else:
+            details[request_id] = response
+
+    for start in range(0, len(message_ids), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_response)
+        for message_id in message_ids[start:start + BATCH_SIZE]:
+            batch.add(_get_request(service, message_id, include_body), request_id=message_id)
+        batch.execute()
+
+    for message_id in failed:
+        try:
+            details[message_id] = _get_request(service, message_id, include_body).execute(num_retries=2)
+        except Exception as e:
+            logger.warning(f"Failed to fetch message {message_id}: {str(e)}")
+
+    return details
+
+
+def fetch_messages(service, message_ids: List[str], include_body: bool = True) -> List[Dict[str, str]]:
+    """Fetch and summarize messages, keeping the order of `message_ids`"""
+    details = fetch_message_details(service, message_ids, include_body)
+    return [summarize_message(details[message_id], include_body)
+            for message_id in message_ids if message_id in details]
+
+
+def list_message_ids(service, query: str, limit: int, page_token: Optional[str] = None):
+    """Return (message ids, next page token) for a Gmail search"""
+    results = service.users().messages().list(userId='me', q=query, maxResults=limit,
+                                              pageToken=page_token).execute()
+    return [msg['id'] for msg in results.get('messages', [])], results.get('nextPageToken')
+
+
+def list_all_message_ids(service, query: str, max_results: int):
+    """
+    Page through a Gmail search until `max_results` ids are collected.
+
+    Returns (ids, truncated) where truncated means more matches were left.
+    """
+    message_ids = []
+    page_token = None
+    while len(message_ids) < max_results:
+        page_ids, page_token = list_message_ids(service, query, min(LIST_PAGE_SIZE, max_results - len(message_ids)),
+                                                page_token)
+        message_ids.extend(page_ids)
+        if not page_token:
+            return message_ids, False
+    return message_ids, True
+
+
+def message_participants(summary: Dict[str, str]) -> List[str]:
+    """Lower-cased addresses found in a message's From/To/Cc/Bcc headers"""
+    headers = [summary.get(field, '') for field in ('from', 'to', 'cc', 'bcc')]
+    return sorted({address.lower() for _, address in getaddresses(headers) if address})
+
+
+def contact_query(addresses: List[str]) -> str:
+    return ' OR '.join(f'to:{address} OR from:{address}' for address in addresses)
+
+
+def group_by_contact(details: Dict[str, dict], addresses: List[str], limit: int,
+                     include_body: bool = True) -> Dict[str, List[Dict[str, str]]]:
+    """Newest-first messages per address, at most `limit` each; one message may serve several contacts"""
+    groups = {address: [] for address in addresses}
+    ordered = sorted(details.values(), key=lambda detail: int(detail.get('internalDate', 0)), reverse=True)
+    for detail in ordered:
+        summary = summarize_message(detail, include_body)
+        for address in message_participants(summary):
+            if address in groups and len(groups[address]) < limit:
+                groups[address].append(summary)
+    return groups
+
+
+def scan_contacts(service, addresses: List[str], limit: int, include_body: bool = True):
+    """
+    Fetch up to `limit` recent messages for each of many contacts.
+
+    Addresses are searched in chunks of CONTACTS_PER_QUERY with one combined
+    OR query each, and every matching message is fetched exactly once, even
+    when it involves several contacts. A contact crowded out of a truncated
+    combined query gets a follow-up query of its own.
+
+    Returns (raw message resources keyed by id, summaries grouped per address).
+    """
+    addresses = list(dict.fromkeys(address.lower() for address in addresses))
+    message_ids = []
+    crowded = []
+    for start in range(0, len(addresses), CONTACTS_PER_QUERY):
+        chunk = addresses[start:start + CONTACTS_PER_QUERY]
+        chunk_ids, truncated = list_all_message_ids(service, contact_query(chunk), limit * len(chunk))
+        message_ids.extend(chunk_ids)
+        if truncated and len(chunk) > 1:
+            crowded.extend(chunk)
+
+    details = fetch_message_details(service, list(dict.fromkeys(message_ids)), include_body)
+    groups = group_by_contact(details, addresses, limit, include_body)
+
+    short = [address for address in crowded if len(groups[address]) < limit]
+    if short:
+        extra_ids = []
+        for address in short:
+            extra_ids.extend(list_all_message_ids(service, contact_query([address]), limit)[0])
+        missing = [message_id for message_id in dict.fromkeys(extra_ids) if message_id not in details]
+        details.update(fetch_message_details(service, missing, include_body))
+        groups.update(group_by_contact(details, short, limit, include_body))
+
+    return details, groups
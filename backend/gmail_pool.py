@@ -0,0 +1,108 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from http_client import http
+
+logger = logging.getLogger(__name__)
+
+GMAIL_DISCOVERY_URL = "https://gmail.googleapis.com/$discovery/rest?version=v1"
+
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+
+def gmail_discovery_document() -> dict:
+    """Load and parse the Gmail v1 discovery document once per process"""
+    global _discovery_document
+    if _discovery_document is None:
+        with _discovery_lock:
+            if _discovery_document is None:
+                document = get_static_doc("gmail", "v1")
+                if document is None:
+                    logger.info("No bundled Gmail discovery document, fetching it once")
+                    response = http.get(GMAIL_DISCOVERY_URL)
+                    response.raise_for_status()
+                    document = response.text
+                _discovery_document = json.loads(document)
+    return _discovery_document
+
+
+def build_gmail_service(creds):
+    """Build a Gmail service from the cached discovery document"""
+    return build_from_document(gmail_discovery_document(), credentials=creds)
+
+
+class GmailServicePool:
+    """
+    Thread-safe pool of Gmail service objects per user.
+
+    googleapiclient services (and their httplib2 transports) must not be used
+    by two threads at once, so callers check a service out for the duration of
+    a request and it is returned afterwards for reuse. Users are evicted least
+    recently used first once `max_users` is exceeded. Services are bound to the
+    credentials object they were built with; passing a different one (rotated
+    tokens, re-authorization) discards the old services.
+    """
+
+    def __init__(self, max_users: int = 256, max_idle_per_user: int = 4):
+        self.max_users = max_users
+        self.max_idle_per_user = max_idle_per_user
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"built": 0, "reused": 0, "evictions": 0, "rotations": 0}
+
+    @contextmanager
+    def service(self, user_id: str, creds):
+        service = self._checkout(user_id, creds)
+        try:
+            yield service
+        finally:
+            self._checkin(user_id, creds, service)
+
+    def _checkout(self, user_id, creds):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry["creds"] is not creds:
+                # Credentials rotated: services built with the old ones are stale
+                del self._users[user_id]
+                self._counters["rotations"] += 1
+                entry = None
+            if entry is not None:
+                self._users.move_to_end(user_id)
+                if entry["idle"]:
+                    self._counters["reused"] += 1
+                    return entry["idle"].pop()
+            self._counters["built"] += 1
+        return build_gmail_service(creds)
+
+    def _checkin(self, user_id, creds, service):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = self._users[user_id] = {"creds": creds, "idle": []}
+            elif entry["creds"] is not creds:
+                return
+            self._users.move_to_end(user_id)
+            if len(entry["idle"]) < self.max_idle_per_user:
+                entry["idle"].append(service)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, user_id: str):
+        """Drop every pooled service for a user"""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["users"] = len(self._users)
+            stats["idle_services"] = sum(len(entry["idle"]) for entry in self._users.values())
+            return stats
@@ -0,0 +1,110 @@
+import base64
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# messages.send costs 100 of the 250 quota units Gmail grants per user per second
+SENDS_PER_SECOND = float(os.getenv('GMAIL_SENDS_PER_SECOND', 2))
+SEND_CONCURRENCY = int(os.getenv('GMAIL_SEND_CONCURRENCY', 4))
+MAX_BULK_MESSAGES = int(os.getenv('GMAIL_MAX_BULK_MESSAGES', 500))
+
+# Retries googleapiclient performs itself on 429/5xx, with exponential backoff
+SEND_RETRIES = 3
+
+# MIME building is pure CPU work; a small shared pool keeps it off the send threads
+_mime_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mime")
+
+
+def build_raw_message(to_email: str, subject: str, body: str) -> str:
+    """Build a base64url-encoded MIME message for messages.send"""
+    message = MIMEText(body)
+    message['to'] = to_email
+    message['subject'] = subject
+    return base64.urlsafe_b64encode(message.as_bytes()).decode()
+
+
+class SendPacer:
+    """Spaces out sends so one user never exceeds `rate` messages per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_pacers = defaultdict(lambda: SendPacer(SENDS_PER_SECOND))
+_pacers_lock = threading.Lock()
+
+
+def pacer_for(user_id: str) -> SendPacer:
+    with _pacers_lock:
+        return _pacers[user_id]
+
+
+def validate_messages(messages: List[dict]) -> List[str]:
+    """Return one error string per message ('' when the message is valid)"""
+    errors = []
+    for message in messages:
+        if not isinstance(message, dict):
+            errors.append("Message must be an object")
+        elif not all(message.get(field) for field in ('to', 'subject', 'body')):
+            errors.append("Missing one of: to, subject, body")
+        else:
+            errors.append('')
+    return errors
+
+
+def send_bulk(pool, user_id: str, creds, messages: List[dict], concurrency: int = None) -> List[Dict]:
+    """
+    Send many messages for one user and return a status per message, in input order.
+
+    Credentials are resolved once by the caller. MIME messages are built in a
+    worker pool, then sent by up to `concurrency` threads, each with its own
+    pooled Gmail service, paced to the per-user send rate.
+    """
+    errors = validate_messages(messages)
+    valid = [idx for idx, error in enumerate(errors) if not error]
+    raw_messages = dict(zip(valid, _mime_pool.map(
+        lambda idx: build_raw_message(messages[idx]['to'], messages[idx]['subject'], messages[idx]['body']),
+        valid
+    )))
+
+    results = [
+        {'index': idx, 'to': message.get('to') if isinstance(message, dict) else None,
+         'status': 'invalid', 'error': error}
+        for idx, (message, error) in enumerate(zip(messages, errors))
+    ]
+    pacer = pacer_for(user_id)
+
+    def send_one(idx):
+        pacer.wait()
+        try:
+            with pool.service(user_id, creds) as service:
+                sent = service.users().messages().send(
+                    userId='me', body={'raw': raw_messages[idx]}
+                ).execute(num_retries=SEND_RETRIES)
+            results[idx] = {'index': idx, 'to': messages[idx]['to'], 'status': 'sent', 'id': sent['id']}
+        except Exception as e:
+            logger.error(f"Failed to send message {idx} for {user_id}: {str(e)}")
+            results[idx] = {'index': idx, 'to': messages[idx]['to'], 'status': 'error', 'error': str(e)}
+
+    workers = max(1, min(concurrency or SEND_CONCURRENCY, SEND_CONCURRENCY, len(valid) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gmail-send") as executor:
+        list(executor.map(send_one, valid))
+
+    return results
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Upstream responses worth retrying: rate limited or temporarily unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Methods that are safe to repeat. Anything else (POST, PATCH) is only retried when the
+# caller passes `retries`: a timed-out attempt may already have succeeded upstream
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[str] = None) -> float:
+    """
+    Full-jitter exponential backoff, honouring a numeric Retry-After header.
+
+    attempt 0 sleeps up to `base`, attempt 1 up to 2 * `base` and so on, never
+    more than `cap` seconds.
+    """
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def default_retries(method: str, max_retries: int) -> int:
+    """Retries for a request that didn't set `retries`: none for non-idempotent methods"""
+    return max_retries if method.upper() in IDEMPOTENT_METHODS else 0
+
+
+class _HostStats:
+    """Thread-safe per-host request counters shared by both client flavors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = defaultdict(lambda: {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0
+        })
+
+    def start(self, host: str):
+        with self._lock:
+            stats = self._hosts[host]
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+
+    def finish(self, host: str, failed: bool = False):
+        with self._lock:
+            self._hosts[host]["in_flight"] -= 1
+            if failed:
+                self._hosts[host]["failures"] += 1
+
+    def retry(self, host: str):
+        with self._lock:
+            self._hosts[host]["retries"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._hosts.items()}
+
+
+class HttpClient:
+    """
+    Shared synchronous HTTP client.
+
+    One `requests.Session` with a per-host connection pool, default
+    connect/read timeouts and bounded retries with jittered backoff on
+    429/5xx responses and connection errors. Only idempotent methods are
+    retried unless the caller asks. Safe to share between threads.
+    """
+
+    def __init__(self, connect_timeout: float = 3.05, read_timeout: float = 20, max_retries: int = 2,
+                 backoff: float = 0.5, max_backoff: float = 8, pool_hosts: int = 20, pool_maxsize: int = 20):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._stats = _HostStats()
+
+        self._adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+    @classmethod
+    def from_env(cls) -> "HttpClient":
+        return cls(**_settings_from_env())
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, read_timeout: Optional[float] = None,
+                **kwargs) -> requests.Response:
+        """
+        Send a request, retrying on 429/5xx and connection errors.
+
+        `retries` defaults to the client's setting for idempotent methods and
+        0 for the rest. `read_timeout` overrides the read timeout for slow
+        endpoints. Returns the final response (which may still be an error
+        status once retries are exhausted); raises the last exception if every
+        attempt failed.
+        """
+        kwargs.setdefault("timeout", self.timeout if read_timeout is None else (self.timeout[0], read_timeout))
+        max_retries = default_retries(method, self.max_retries) if retries is None else retries
+        host = urlsplit(url).netloc
+
+        self._stats.start(host)
+        failed = True
+        try:
+            for attempt in range(max_retries + 1):
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt >= max_retries:
+                        raise
+                    delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                    logger.warning(f"{method} {host} failed ({e}), retrying in {delay:.2f}s")
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                        failed = response.status_code >= 400
+                        return response
+                    delay = backoff_delay(attempt, self.backoff, self.max_backoff,
+                                          response.headers.get("Retry-After"))
+                    logger.warning(f"{method} {host} returned {response.status_code}, retrying in {delay:.2f}s")
+                    response.close()
+                self._stats.retry(host)
+                time.sleep(delay)
+        finally:
+            self._stats.finish(host, failed)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        hosts = self._stats.snapshot()
+        pool_manager = self._adapter.poolmanager
+        for key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            host_stats = hosts.setdefault(host, {})
+            host_stats["connections_opened"] = pool.num_connections
+            # The pool queue is pre-filled with None placeholders; count real sockets only
+            host_stats["idle_connections"] = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+        return {"pool_maxsize": self.pool_maxsize, "hosts": hosts}
+
+
+class AsyncHttpClient:
+    """
+    Shared asyncio HTTP client, the aiohttp counterpart of `HttpClient`.
+
+    Keeps one `aiohttp.ClientSession` per event loop with a bounded per-host
+    connector, so a long-lived loop reuses keep-alive connections across
+    requests. Same timeout and retry policy as the sync client.
+    """
+
+    def __init__(self, connect_timeout: float = 3.05, read_timeout: float = 20, max_retries: int = 2,
+                 backoff: float = 0.5, max_backoff: float = 8, pool_hosts: int = 20, pool_maxsize: int = 20):
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_limit = pool_hosts * pool_maxsize
+        self.pool_maxsize = pool_maxsize
+        self._stats = _HostStats()
+        self._sessions = {}
+        self._closers = {}
+
+    @classmethod
+    def from_env(cls) -> "AsyncHttpClient":
+        return cls(**_settings_from_env())
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Return the session bound to the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            for stale in [other for other in self._sessions if other.is_closed()]:
+                self._discard(stale)
+            connector = aiohttp.TCPConnector(limit=self.pool_limit, limit_per_host=self.pool_maxsize)
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._sessions[loop] = session
+            self._closers[loop] = loop.create_task(self._close_with_loop(session))
+        return session
+
+    @staticmethod
+    async def _close_with_loop(session: aiohttp.ClientSession):
+        """
+        Close `session` when its loop shuts down.
+
+        asyncio.run() (and Flask's async views through asgiref) cancel every
+        pending task before closing the loop, so this closes the session's
+        sockets while the loop can still do it. On a long-lived loop it just
+        waits.
+        """
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await session.close()
+
+    def _discard(self, loop):
+        """Drop the session of a closed loop, closing it if the loop closed without cancelling tasks"""
+        self._closers.pop(loop, None)
+        session = self._sessions.pop(loop)
+        if not session.closed:
+            logger.warning("Event loop closed with its HTTP session still open; closing it now")
+            try:
+                session.connector.close()
+            except Exception as e:
+                logger.warning(f"Error closing stale HTTP session: {str(e)}")
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None,
+                      read_timeout: Optional[float] = None, **kwargs) -> aiohttp.ClientResponse:
+        """
+        Send a request, retrying on 429/5xx and connection errors.
+
+        `retries` and `read_timeout` work as in `HttpClient.request`. The body
+        is read before returning, so `await response.json()` and
+        `response.raise_for_status()` work without holding the connection.
+        """
+        session = await self.session()
+        if read_timeout is not None:
+            kwargs.setdefault("timeout", aiohttp.ClientTimeout(total=None, connect=self.timeout.connect,
+                                                               sock_read=read_timeout))
+        max_retries = default_retries(method, self.max_retries) if retries is None else retries
+        host = urlsplit(url).netloc
+
+        self._stats.start(host)
+        failed = True
+        try:
+            for attempt in range(max_retries + 1):
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        await response.read()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if attempt >= max_retries:
+                        raise
+                    delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                    logger.warning(f"{method} {host} failed ({e!r}), retrying in {delay:.2f}s")
+                else:
+                    if response.status not in RETRY_STATUSES or attempt >= max_retries:
+                        failed = response.status >= 400
+                        return response
+                    delay = backoff_delay(attempt, self.backoff, self.max_backoff,
+                                          response.headers.get("Retry-After"))
+                    logger.warning(f"{method} {host} returned {response.status}, retrying in {delay:.2f}s")
+                self._stats.retry(host)
+                await asyncio.sleep(delay)
+        finally:
+            self._stats.finish(host, failed)
+
+    async def get(self, url: str, **kwargs) -> aiohttp.ClientResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> aiohttp.ClientResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self):
+        """Close the session bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        closer = self._closers.pop(loop, None)
+        if closer is not None:
+            closer.cancel()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool_limit": self.pool_limit,
+            "pool_maxsize": self.pool_maxsize,
+            "sessions": len(self._sessions),
+            "hosts": self._stats.snapshot()
+        }
+
+
+def _settings_from_env() -> Dict[str, Any]:
+    return {
+        "connect_timeout": float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05)),
+        "read_timeout": float(os.getenv("HTTP_READ_TIMEOUT", 20)),
+        "max_retries": int(os.getenv("HTTP_MAX_RETRIES", 2)),
+        "backoff": float(os.getenv("HTTP_BACKOFF", 0.5)),
+        "max_backoff": float(os.getenv("HTTP_MAX_BACKOFF", 8)),
+        "pool_hosts": int(os.getenv("HTTP_POOL_HOSTS", 20)),
+        "pool_maxsize": int(os.getenv("HTTP_POOL_MAXSIZE", 20))
+    }
+
+
+# Process-wide clients shared by every outbound caller
+http = HttpClient.from_env()
+async_http = AsyncHttpClient.from_env()
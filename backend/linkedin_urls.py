@@ -0,0 +1,92 @@
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+# /in/<slug> profile paths
+_PROFILE_PATH = re.compile(r'^/in/([^/]+)', re.IGNORECASE)
+# Legacy /pub/<name>/<id>/<id>/<id> profiles; the ids are part of the identity, so
+# these are never rewritten to /in/<name> (that is a different profile)
+_LEGACY_PROFILE_PATH = re.compile(r'^/pub/[^/]+/', re.IGNORECASE)
+
+# Query parameters that only track where a click came from (plus any utm_*)
+_TRACKING_PARAMS = {'trk', 'trackingid', 'ref', 'ref_src', 'fbclid', 'gclid', 'igshid', 'si', 'originalsubdomain'}
+
+
+def canonical_linkedin_url(url: str) -> Optional[str]:
+    """
+    Reduce a LinkedIn profile URL to https://www.linkedin.com/in/<slug>.
+
+    Country subdomains (uk., de., ...), scheme, query strings, fragments,
+    trailing path segments (/en, /details/...) and slug case are all
+    dropped, so every spelling of a profile maps to one key. Returns None
+    for anything that is not an /in/ profile URL.
+    """
+    parts = _linkedin_parts(url)
+    if parts is None:
+        return None
+    match = _PROFILE_PATH.match(parts.path)
+    if not match:
+        return None
+    slug = unquote(match.group(1)).strip().lower()
+    return f"https://www.linkedin.com/in/{slug}" if slug else None
+
+
+def _linkedin_parts(url: str):
+    if not url:
+        return None
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if host != 'linkedin.com' and not host.endswith('.linkedin.com'):
+        return None
+    return parts
+
+
+def linkedin_profile_key(url: str) -> Optional[str]:
+    """
+    Dedupe/cache key for a LinkedIn profile URL, or None if it is not one.
+
+    /in/ profiles use `canonical_linkedin_url`; legacy /pub/ profiles keep
+    their full path (lower-cased, without query or fragment). Only a key:
+    requests to LinkedIn or Apollo should use the URL the caller gave.
+    """
+    canonical = canonical_linkedin_url(url)
+    if canonical:
+        return canonical
+    parts = _linkedin_parts(url)
+    if parts is None or not _LEGACY_PROFILE_PATH.match(parts.path):
+        return None
+    return f"https://www.linkedin.com{unquote(parts.path).rstrip('/').lower()}"
+
+
+def canonical_url(url: str) -> str:
+    """
+    Canonical form of any result URL, used to spot the same page under different spellings.
+
+    Only a dedupe key: results should keep the link as found. LinkedIn
+    profiles go through `linkedin_profile_key`. Other URLs get a lower-cased
+    host without `www.` (a non-default port is kept), lose their fragment,
+    trailing slash and tracking parameters, and keep any other query
+    parameters (they can identify the page, e.g. profile.php?id=...).
+    Returns '' for an empty URL.
+    """
+    if not url or not url.strip():
+        return ''
+    linkedin = linkedin_profile_key(url)
+    if linkedin:
+        return linkedin
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None  # Malformed port (e.g. ":abc"); key on the bare host rather than failing the search
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                       if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith('utm_')])
+    return urlunsplit(('https', host, parts.path.rstrip('/'), query, ''))
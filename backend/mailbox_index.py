@@ -0,0 +1,268 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from gmail_messages import fetch_message_details, message_participants, scan_contacts, summarize_message
+
+logger = logging.getLogger(__name__)
+
+# Messages pulled from Gmail the first time a contact is looked up
+SEED_PER_CONTACT = int(os.getenv('MAILBOX_SEED_PER_CONTACT', 100))
+
+# Indexed messages carrying any of these labels are left out of lookups
+HIDDEN_LABELS = ('TRASH', 'SPAM', 'DRAFT')
+
+# Default index file, kept next to this module so it doesn't depend on the working directory
+DEFAULT_INDEX_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mailbox_index.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    thread_id TEXT,
+    internal_date INTEGER NOT NULL DEFAULT 0,
+    sender TEXT, recipient TEXT, cc TEXT, bcc TEXT, date TEXT, subject TEXT, body TEXT,
+    label_ids TEXT NOT NULL DEFAULT ',',
+    PRIMARY KEY (user_id, id)
+);
+CREATE INDEX IF NOT EXISTS messages_by_date ON messages (user_id, internal_date);
+CREATE TABLE IF NOT EXISTS participants (
+    user_id TEXT NOT NULL,
+    address TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, address, message_id)
+);
+CREATE INDEX IF NOT EXISTS participants_by_message ON participants (user_id, message_id);
+CREATE TABLE IF NOT EXISTS seeded_contacts (
+    user_id TEXT NOT NULL,
+    address TEXT NOT NULL,
+    seeded_at REAL NOT NULL,
+    PRIMARY KEY (user_id, address)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id TEXT PRIMARY KEY,
+    history_id TEXT NOT NULL,
+    last_sync REAL NOT NULL
+);
+"""
+
+MESSAGE_COLUMNS = ('user_id', 'id', 'thread_id', 'internal_date', 'sender', 'recipient', 'cc', 'bcc',
+                   'date', 'subject', 'body', 'label_ids')
+
+
+def _pack_labels(label_ids) -> str:
+    """Store labels as ",A,B," so a single label can be matched with LIKE"""
+    return ',' + ''.join(f"{label}," for label in label_ids)
+
+
+class MailboxIndex:
+    """
+    Local SQLite index of Gmail message metadata and truncated bodies.
+
+    Contacts are seeded lazily: the first lookup of an address runs one Gmail
+    search for it. After that, every message added to or deleted from the
+    mailbox, and every label change, arrives through `historyId` deltas, so
+    lookups are answered locally and only the changes since the last sync
+    are fetched. Messages in trash or spam and drafts stay indexed with
+    their labels but are never returned.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._user_locks = defaultdict(threading.Lock)
+
+    @classmethod
+    def from_env(cls) -> "MailboxIndex":
+        return cls(os.getenv('MAILBOX_INDEX_DB', DEFAULT_INDEX_DB))
+
+    def _migrate(self):
+        """Indexes built before labels were stored are dropped and rebuilt lazily"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(messages)")}
+        if 'label_ids' in columns:
+            return
+        logger.info("Mailbox index has no labels, rebuilding it")
+        self._db.execute("ALTER TABLE messages ADD COLUMN label_ids TEXT NOT NULL DEFAULT ','")
+        for table in ('messages', 'participants', 'seeded_contacts', 'sync_state'):
+            self._db.execute(f"DELETE FROM {table}")
+
+    # -- storage -----------------------------------------------------------
+
+    def history_id(self, user_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT history_id FROM sync_state WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_history_id(self, user_id: str, history_id: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sync_state (user_id, history_id, last_sync) VALUES (?, ?, ?)",
+                             (user_id, str(history_id), time.time()))
+            self._db.commit()
+
+    def is_seeded(self, user_id: str, address: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM seeded_contacts WHERE user_id = ? AND address = ?",
+                                   (user_id, address.lower())).fetchone()
+        return row is not None
+
+    def mark_seeded(self, user_id: str, address: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO seeded_contacts (user_id, address, seeded_at) VALUES (?, ?, ?)",
+                             (user_id, address.lower(), time.time()))
+            self._db.commit()
+
+    def upsert_messages(self, user_id: str, details: Dict[str, dict]):
+        """Store full Gmail message resources (bodies are truncated on the way in)"""
+        rows, participant_rows = [], []
+        for message_id, detail in details.items():
+            summary = summarize_message(detail, include_body=True)
+            rows.append((user_id, message_id, detail.get('threadId'), int(detail.get('internalDate', 0)),
+                         summary['from'], summary['to'], summary['cc'], summary['bcc'],
+                         summary['date'], summary['subject'], summary['body'],
+                         _pack_labels(detail.get('labelIds', []))))
+            participant_rows.extend((user_id, address, message_id) for address in message_participants(summary))
+        with self._lock:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO messages ({', '.join(MESSAGE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in MESSAGE_COLUMNS)})", rows
+            )
+            self._db.executemany("INSERT OR IGNORE INTO participants VALUES (?, ?, ?)", participant_rows)
+            self._db.commit()
+
+    def delete_messages(self, user_id: str, message_ids: List[str]):
+        with self._lock:
+            for message_id in message_ids:
+                self._db.execute("DELETE FROM messages WHERE user_id = ? AND id = ?", (user_id, message_id))
+                self._db.execute("DELETE FROM participants WHERE user_id = ? AND message_id = ?",
+                                 (user_id, message_id))
+            self._db.commit()
+
+    def update_labels(self, user_id: str, changes: List[Tuple[str, List[str], List[str]]]):
+        """Apply (message id, labels added, labels removed) changes in order; unknown messages are skipped"""
+        with self._lock:
+            for message_id, added, removed in changes:
+                row = self._db.execute("SELECT label_ids FROM messages WHERE user_id = ? AND id = ?",
+                                       (user_id, message_id)).fetchone()
+                if row is None:
+                    continue
+                labels = [label for label in row[0].split(',') if label and label not in removed]
+                labels.extend(label for label in added if label not in labels)
+                self._db.execute("UPDATE messages SET label_ids = ? WHERE user_id = ? AND id = ?",
+                                 (_pack_labels(labels), user_id, message_id))
+            self._db.commit()
+
+    def reset_user(self, user_id: str):
+        with self._lock:
+            for table in ('messages', 'participants', 'seeded_contacts', 'sync_state'):
+                self._db.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            self._db.commit()
+
+    def messages_with(self, user_id: str, address: str, limit: int, include_body: bool = True) -> List[dict]:
+        """Newest `limit` indexed messages that `address` sent or received, outside trash, spam and drafts"""
+        visible = ''.join(" AND m.label_ids NOT LIKE ?" for _ in HIDDEN_LABELS)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT m.id, m.sender, m.recipient, m.cc, m.bcc, m.date, m.subject, m.body "
+                "FROM participants p JOIN messages m ON m.user_id = p.user_id AND m.id = p.message_id "
+                f"WHERE p.user_id = ? AND p.address = ?{visible} ORDER BY m.internal_date DESC LIMIT ?",
+                (user_id, address.lower(), *(f"%,{label},%" for label in HIDDEN_LABELS), limit)
+            ).fetchall()
+        emails = []
+        for message_id, sender, recipient, cc, bcc, date, subject, body in rows:
+            email = {'id': message_id, 'from': sender, 'to': recipient, 'cc': cc, 'bcc': bcc,
+                     'date': date, 'subject': subject}
+            if include_body:
+                email['body'] = body
+            emails.append(email)
+        return emails
+
+    # -- Gmail sync --------------------------------------------------------
+
+    def sync(self, service, user_id: str):
+        """
+        Bring the user's index up to date.
+
+        The first call only records the current historyId; later calls apply
+        the messages added/deleted and the label changes since then. If Gmail no longer has history
+        that old, the user's index is dropped and rebuilt lazily.
+        """
+        history_id = self.history_id(user_id)
+        if history_id is None:
+            profile = service.users().getProfile(userId='me').execute()
+            self.set_history_id(user_id, profile['historyId'])
+            return
+
+        added, deleted, label_changes = [], set(), []
+        page_token = None
+        latest = history_id
+        try:
+            while True:
+                response = service.users().history().list(
+                    userId='me', startHistoryId=history_id, pageToken=page_token,
+                    historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']
+                ).execute()
+                for record in response.get('history', []):
+                    for item in record.get('messagesAdded', []):
+                        added.append(item['message']['id'])
+                    for item in record.get('messagesDeleted', []):
+                        deleted.add(item['message']['id'])
+                    for item in record.get('labelsAdded', []):
+                        label_changes.append((item['message']['id'], item.get('labelIds', []), []))
+                    for item in record.get('labelsRemoved', []):
+                        label_changes.append((item['message']['id'], [], item.get('labelIds', [])))
+                latest = response.get('historyId', latest)
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        except HttpError as e:
+            if e.resp.status == 404:
+                logger.info(f"History for {user_id} expired, rebuilding mailbox index")
+                self.reset_user(user_id)
+                self.sync(service, user_id)
+                return
+            raise
+
+        added = [message_id for message_id in dict.fromkeys(added) if message_id not in deleted]
+        if added:
+            self.upsert_messages(user_id, fetch_message_details(service, added, include_body=True))
+        # Messages fetched just now already carry their current labels
+        fetched = set(added)
+        label_changes = [change for change in label_changes if change[0] not in fetched and change[0] not in deleted]
+        if label_changes:
+            self.update_labels(user_id, label_changes)
+        if deleted:
+            self.delete_messages(user_id, list(deleted))
+        self.set_history_id(user_id, latest)
+
+    def seed_contacts(self, service, user_id: str, addresses: List[str]):
+        """Index the most recent messages exchanged with each address, in one chunked scan"""
+        details, _ = scan_contacts(service, addresses, SEED_PER_CONTACT, include_body=True)
+        if details:
+            self.upsert_messages(user_id, details)
+        for address in addresses:
+            self.mark_seeded(user_id, address)
+
+    def read_with(self, service, user_id: str, address: str, limit: int = 10,
+                  include_body: bool = True) -> List[dict]:
+        """Sync the delta since the last check, then answer from the local index"""
+        return self.read_with_many(service, user_id, [address], limit, include_body)[address.lower()]
+
+    def read_with_many(self, service, user_id: str, addresses: List[str], limit: int = 10,
+                       include_body: bool = True) -> Dict[str, List[dict]]:
+        """Like `read_with` for many contacts: one sync, one scan for unseeded contacts"""
+        addresses = list(dict.fromkeys(address.lower() for address in addresses))
+        with self._user_locks[user_id]:
+            self.sync(service, user_id)
+            unseeded = [address for address in addresses if not self.is_seeded(user_id, address)]
+            if unseeded:
+                self.seed_contacts(service, user_id, unseeded)
+        return {address: self.messages_with(user_id, address, limit, include_body) for address in addresses}
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_people_query(query: str) -> str:
+    """Case-fold and collapse whitespace; Linkd's semantic search ignores both"""
+    return " ".join(query.lower().split())
+
+
+def normalize_schools(schools) -> List[str]:
+    """
+    School filter as sent to Linkd and used in cache keys: a single string
+    becomes a one-item list, names are stripped, empty and repeated ones
+    dropped, and the rest sorted. Raises ValueError for anything else.
+    """
+    if not schools:
+        return []
+    if isinstance(schools, str):
+        schools = [schools]
+    if not isinstance(schools, list) or not all(isinstance(school, str) for school in schools):
+        raise ValueError("schools must be a string or a list of strings")
+    return sorted({school.strip() for school in schools if school.strip()})
+
+
+class PeopleSearchCache:
+    """
+    Stale-while-revalidate LRU cache for Linkd people searches.
+
+    Keys are (normalized query, limit, schools from `normalize_schools`). An entry younger than
+    `ttl` is a plain hit. Up to `stale_ttl` seconds after that it is still
+    served at once, and a single background refresh replaces it. Older entries
+    count as misses and are fetched inline.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 900, stale_ttl: float = 86400,
+                 refresh_workers: int = 2):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="people-refresh")
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0,
+                          "refresh_errors": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "PeopleSearchCache":
+        """Build a cache from PEOPLE_CACHE_SIZE, PEOPLE_CACHE_TTL and PEOPLE_CACHE_STALE_TTL"""
+        return cls(
+            max_entries=int(os.getenv("PEOPLE_CACHE_SIZE", 512)),
+            ttl=float(os.getenv("PEOPLE_CACHE_TTL", 900)),
+            stale_ttl=float(os.getenv("PEOPLE_CACHE_STALE_TTL", 86400))
+        )
+
+    @staticmethod
+    def make_key(query: str, limit: int, schools: Optional[List[str]] = None) -> str:
+        """`schools` must already be normalized, so the key matches the request actually sent"""
+        return json.dumps([normalize_people_query(query), int(limit), list(schools or [])])
+
+    def lookup(self, query: str, limit: int, schools: Optional[List[str]],
+               fetch: Callable[[], Any]) -> Tuple[Any, str, int]:
+        """
+        Return (value, status, age in seconds); status is HIT, STALE or MISS.
+
+        `fetch()` is called inline on a miss and in the background for a stale
+        entry. Exceptions from an inline fetch propagate and nothing is cached.
+        """
+        key = self.make_key(query, limit, schools)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                age = now - stored_at
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    if age < self.ttl:
+                        self._counters["hits"] += 1
+                        return value, "HIT", int(age)
+                    self._counters["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._refresher.submit(self._refresh, key, fetch)
+                    return value, "STALE", int(age)
+                del self._entries[key]
+            self._counters["misses"] += 1
+
+        value = fetch()
+        self._store(key, value)
+        return value, "MISS", 0
+
+    def _refresh(self, key: str, fetch: Callable[[], Any]):
+        try:
+            value = fetch()
+        except Exception as e:
+            logger.warning(f"Background refresh of people search failed, keeping stale entry: {str(e)}")
+            with self._lock:
+                self._counters["refresh_errors"] += 1
+        else:
+            self._store(key, value)
+            with self._lock:
+                self._counters["refreshes"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["refreshing"] = len(self._refreshing)
+            lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+            return stats
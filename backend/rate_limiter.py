@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Default budgets per upstream API: sustained requests/second, burst size,
+# requests per day (0 = no daily cap) and what to do when over budget.
+# No daily caps by default, since the right one depends on the account: set
+# GOOGLE_CSE_DAILY_LIMIT=100 on Custom Search's free tier (its quota resets at midnight Pacific).
+DEFAULT_BUDGETS = {
+    "google_cse": {"rate": 1.5, "burst": 5, "daily_limit": 0, "policy": "wait"},
+    "asi1": {"rate": 2, "burst": 4, "daily_limit": 0, "policy": "wait"},
+    "linkd": {"rate": 1, "burst": 3, "daily_limit": 0, "policy": "wait"},
+    "apollo": {"rate": 0.8, "burst": 5, "daily_limit": 0, "policy": "wait"}
+}
+
+# Next to this module rather than in the working directory, so app.py and
+# dorks_agent.py share one ledger whichever directory they are started from
+DEFAULT_LEDGER_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quota_ledger.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_ledger (
+    api TEXT NOT NULL,
+    day TEXT NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (api, day)
+);
+"""
+
+
+class QuotaExceeded(Exception):
+    """Raised when a call would exceed an API's budget and the policy is to reject"""
+
+    def __init__(self, api: str, reason: str, retry_after: float):
+        super().__init__(f"{api} {reason} limit reached, retry after {retry_after:.0f}s")
+        self.api = api
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that hands out reservations.
+
+    `reserve()` always takes a token, letting the balance go negative, and
+    returns how long the caller must wait before using it. Concurrent callers
+    therefore queue up in arrival order at exactly `rate` per second.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, tokens: float = 1):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + tokens)
+
+
+class DailyLedger:
+    """
+    Per-API daily usage counters in SQLite, so restarts don't reset the day's count.
+
+    Several processes may point at the same file; increments run in an
+    immediate transaction so the check-and-add is atomic across them.
+    """
+
+    def __init__(self, db_path: str = ":memory:", timezone: str = "America/Los_Angeles"):
+        self.timezone = ZoneInfo(timezone)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def today(self) -> str:
+        return datetime.now(self.timezone).date().isoformat()
+
+    def seconds_until_reset(self) -> float:
+        now = datetime.now(self.timezone)
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return 86400 - (now - midnight).total_seconds()
+
+    def used(self, api: str) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT used FROM quota_ledger WHERE api = ? AND day = ?",
+                                   (api, self.today())).fetchone()
+        return row[0] if row else 0
+
+    def consume(self, api: str, limit: int, amount: int = 1, day: Optional[str] = None) -> bool:
+        """Add `amount` to the day's usage (today by default) unless that would exceed `limit` (0 = unlimited)"""
+        day = day or self.today()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT used FROM quota_ledger WHERE api = ? AND day = ?",
+                                       (api, day)).fetchone()
+                used = row[0] if row else 0
+                if limit and used + amount > limit:
+                    return False
+                self._db.execute("INSERT OR REPLACE INTO quota_ledger (api, day, used) VALUES (?, ?, ?)",
+                                 (api, day, used + amount))
+                return True
+            finally:
+                self._db.execute("COMMIT")
+
+    def refund(self, api: str, day: str, amount: int = 1):
+        """Give back usage taken by `consume` for a call that was never made"""
+        with self._lock:
+            self._db.execute("UPDATE quota_ledger SET used = MAX(used - ?, 0) WHERE api = ? AND day = ?",
+                             (amount, api, day))
+
+
+class RateLimiter:
+    """
+    Shared per-API budgets: a token bucket for bursts plus a persisted daily quota.
+
+    With the "wait" policy callers sleep until their turn, up to `max_wait`
+    seconds. With "reject" they get QuotaExceeded at once if they would have
+    to wait. Going over the daily quota always raises QuotaExceeded, because
+    waiting for the next day is never useful. APIs without a budget are not
+    limited. A caller cancelled while waiting gets its token and its daily
+    usage back.
+    """
+
+    def __init__(self, budgets: Dict[str, Dict[str, Any]], ledger: Optional[DailyLedger] = None,
+                 max_wait: float = 30):
+        self.budgets = budgets
+        self.max_wait = max_wait
+        self.ledger = ledger or DailyLedger()
+        self._buckets = {api: TokenBucket(budget["rate"], budget["burst"]) for api, budget in budgets.items()}
+        self._lock = threading.Lock()
+        self._counters = {api: {"calls": 0, "waited": 0, "wait_seconds": 0.0, "rejected_rate": 0,
+                                "rejected_daily": 0, "cancelled": 0} for api in budgets}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Build budgets from DEFAULT_BUDGETS, overridable per API with
+        <API>_RATE, <API>_BURST, <API>_DAILY_LIMIT and <API>_POLICY
+        (e.g. GOOGLE_CSE_DAILY_LIMIT=100, APOLLO_POLICY=reject).
+        """
+        budgets = {}
+        for api, defaults in DEFAULT_BUDGETS.items():
+            prefix = api.upper()
+            budgets[api] = {
+                "rate": float(os.getenv(f"{prefix}_RATE", defaults["rate"])),
+                "burst": float(os.getenv(f"{prefix}_BURST", defaults["burst"])),
+                "daily_limit": int(os.getenv(f"{prefix}_DAILY_LIMIT", defaults["daily_limit"])),
+                "policy": os.getenv(f"{prefix}_POLICY", defaults["policy"])
+            }
+        ledger = DailyLedger(os.getenv("QUOTA_LEDGER_DB", DEFAULT_LEDGER_DB),
+                             os.getenv("QUOTA_DAY_TZ", "America/Los_Angeles"))
+        return cls(budgets, ledger, max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT", 30)))
+
+    def _reserve(self, api: str) -> Tuple[float, Optional[str]]:
+        """
+        Take one call from the budget.
+
+        Returns the seconds to wait before making it and the ledger day it
+        was counted against, for `_release`.
+        """
+        budget = self.budgets.get(api)
+        if budget is None:
+            return 0.0, None
+        bucket = self._buckets[api]
+        wait = bucket.reserve()
+        limit = 0 if budget["policy"] == "reject" else self.max_wait
+        if wait > limit:
+            bucket.refund()
+            self._count(api, "rejected_rate")
+            raise QuotaExceeded(api, "rate", wait)
+        day = self.ledger.today()
+        if not self.ledger.consume(api, budget["daily_limit"], day=day):
+            bucket.refund()
+            self._count(api, "rejected_daily")
+            raise QuotaExceeded(api, "daily", self.ledger.seconds_until_reset())
+        with self._lock:
+            counters = self._counters[api]
+            counters["calls"] += 1
+            if wait > 0:
+                counters["waited"] += 1
+                counters["wait_seconds"] += wait
+        return wait, day
+
+    def _release(self, api: str, day: str):
+        """Undo a reservation whose call will not be made"""
+        self._buckets[api].refund()
+        self.ledger.refund(api, day)
+        with self._lock:
+            counters = self._counters[api]
+            counters["calls"] -= 1
+            counters["cancelled"] += 1
+
+    def _count(self, api: str, counter: str):
+        with self._lock:
+            self._counters[api][counter] += 1
+
+    def acquire(self, api: str):
+        """Block until a call to `api` fits the budget, or raise QuotaExceeded"""
+        wait, day = self._reserve(api)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            except BaseException:
+                self._release(api, day)
+                raise
+
+    async def acquire_async(self, api: str):
+        """asyncio version of `acquire`; waiting yields to the event loop"""
+        wait, day = self._reserve(api)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._release(api, day)
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {api: dict(values) for api, values in self._counters.items()}
+        stats = {}
+        for api, budget in self.budgets.items():
+            stats[api] = dict(budget, **counters[api])
+            stats[api]["wait_seconds"] = round(stats[api]["wait_seconds"], 3)
+            stats[api]["used_today"] = self.ledger.used(api)
+        return stats
+
+
+# Process-wide limiter shared by every outbound API caller
+rate_limiter = RateLimiter.from_env()
@@ -0,0 +1,55 @@
+"""
+Web search shared by app.py and the bot service.
+
+Both import this package and call a backend in-process:
+
+    results = await get_backend().search("site:linkedin.com/in/ ...")
+
+Backends:
+- custom_search: Google Custom Search (the default)
+- dorks: the dorks pipeline from dave_fetchAI/dorks_agent.py
+- remote: app.py's /google_search route, for deployments that keep the
+  search keys on that service only
+
+SEARCH_BACKEND picks the default; SEARCH_REMOTE_URL and SEARCH_REMOTE_BACKEND
+configure the remote mode.
+"""
+import os
+import threading
+from typing import Optional
+from .base import SearchBackend, SearchError
+from .custom_search import CustomSearchBackend
+from .dorks import DorksBackend
+from .remote import RemoteSearchBackend
+
+BACKENDS = ('custom_search', 'dorks', 'remote')
+# Backends that run in this process (app.py must not pick "remote" and call itself)
+LOCAL_BACKENDS = ('custom_search', 'dorks')
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def _build(name: str) -> SearchBackend:
+    if name == 'custom_search':
+        return CustomSearchBackend(num_results=int(os.getenv('SEARCH_NUM_RESULTS', 5)))
+    if name == 'dorks':
+        deadline_ms = os.getenv('SEARCH_DORKS_DEADLINE_MS')
+        return DorksBackend(deadline_ms=int(deadline_ms) if deadline_ms else None)
+    if name == 'remote':
+        return RemoteSearchBackend(os.getenv('SEARCH_REMOTE_URL', os.getenv('APP_URL', 'http://localhost:8080')),
+                                   backend=os.getenv('SEARCH_REMOTE_BACKEND'))
+    raise ValueError(f"Unknown search backend '{name}', expected one of {', '.join(BACKENDS)}")
+
+
+def get_backend(name: Optional[str] = None) -> SearchBackend:
+    """Return the shared instance of backend `name` (default: SEARCH_BACKEND)"""
+    name = name or os.getenv('SEARCH_BACKEND', 'custom_search')
+    with _lock:
+        if name not in _backends:
+            _backends[name] = _build(name)
+        return _backends[name]
+
+
+__all__ = ['BACKENDS', 'LOCAL_BACKENDS', 'SearchBackend', 'SearchError', 'CustomSearchBackend', 'DorksBackend',
+           'RemoteSearchBackend', 'get_backend']
@@ -0,0 +1,27 @@
+from typing import Dict, List, Optional
+
+
+class SearchError(Exception):
+    """Raised when a search service answers with an error or a body that isn't valid results"""
+
+    def __init__(self, status_code: int, details: str):
+        super().__init__(f"Search service returned {status_code}: {details}")
+        self.status_code = status_code
+        self.details = details
+
+
+class SearchBackend:
+    """
+    One way of turning a query into web results.
+
+    Backends return a list of {"title", "link", "snippet"} dicts and raise
+    `QuotaExceeded` when the shared rate limiter refuses a call, so callers
+    can tell "over quota" apart from "no results". The remote backend raises
+    `SearchError` when the service it calls answers with an error. Other
+    failures are logged and come back as an empty list.
+    """
+
+    name = "base"
+
+    async def search(self, query: str, num_results: Optional[int] = None) -> List[Dict[str, str]]:
+        raise NotImplementedError
@@ -0,0 +1,117 @@
+import asyncio
+import requests
+from typing import List, Dict, Optional
+import os
+from dotenv import load_dotenv
+import logging
+from search_cache import search_cache, compact_response
+from http_client import http
+from rate_limiter import rate_limiter, QuotaExceeded
+from .base import SearchBackend
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Log all environment variables (excluding sensitive ones)
+logger.info("Environment variables loaded:")
+for key in os.environ:
+    if key.startswith("GOOGLE_"):
+        logger.info(f"{key}: {'*' * len(os.environ[key])}")
+
+GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+
+class CustomSearchBackend(SearchBackend):
+    """Google Custom Search JSON API, behind the shared search cache and rate limiter"""
+
+    name = "custom_search"
+
+    def __init__(self, num_results: int = 5):
+        self.num_results = num_results
+
+    async def search(self, query: str, num_results: Optional[int] = None) -> List[Dict[str, str]]:
+        # The HTTP client and rate limiter block, so keep them off the event loop
+        return await asyncio.to_thread(self.search_sync, query, num_results or self.num_results)
+
+    def search_sync(self, query: str, num_results: int) -> List[Dict[str, str]]:
+        """
+        Perform a Google search using a custom search API.
+
+        Args:
+            query (str): The search query to use
+            num_results (int): Number of results to request
+
+        Returns:
+            List[Dict[str, str]]: List of search results with title, link, and snippet
+        """
+        try:
+            # Get API key from environment variables
+            api_key = os.getenv("GOOGLE_API_KEY")
+            search_engine_id = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
+
+            logger.info(f"API Key exists: {bool(api_key)}")
+            logger.info(f"Search Engine ID exists: {bool(search_engine_id)}")
+
+            if not api_key or not search_engine_id:
+                raise ValueError("Google API key or Search Engine ID not found in environment variables")
+
+            # Serve repeated queries from the cache instead of spending quota
+            search_results = search_cache.get(query, num=num_results, cx=search_engine_id)
+            if search_results is not None:
+                logger.info(f"Search cache hit for query: {query}")
+            else:
+                # Parameters for the API request
+                params = {
+                    "key": api_key,
+                    "cx": search_engine_id,
+                    "q": query,
+                    "num": num_results
+                }
+
+                logger.info(f"Making request to Google API with query: {query}")
+
+                # Queue behind the shared Custom Search budget instead of bursting into 429s
+                rate_limiter.acquire("google_cse")
+
+                # Make the API request
+                response = http.get(GOOGLE_SEARCH_URL, params=params)
+                logger.info(f"API Response Status: {response.status_code}")
+
+                if response.status_code != 200:
+                    logger.error(f"API Error Response: {response.text}")
+                    return []
+
+                response.raise_for_status()
+
+                # Parse the results
+                search_results = compact_response(response.json())
+                logger.info(f"API Response: {search_results}")
+                search_cache.set(query, search_results, num=num_results, cx=search_engine_id)
+
+            results = []
+
+            if "items" in search_results:
+                for item in search_results["items"]:
+                    results.append({
+                        "title": item.get("title", ""),
+                        "link": item.get("link", ""),
+                        "snippet": item.get("snippet", "")
+                    })
+            else:
+                logger.warning("No 'items' found in API response")
+
+            return results
+
+        except QuotaExceeded:
+            # Callers need to tell "over quota" apart from "no results"
+            raise
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error making API request: {str(e)}")
+            return []
+        except Exception as e:
+            logger.error(f"Error performing Google search: {str(e)}")
+            return []
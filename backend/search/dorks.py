@@ -0,0 +1,59 @@
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+from rate_limiter import QuotaExceeded
+from .base import SearchBackend
+
+logger = logging.getLogger(__name__)
+
+# The dorks pipeline lives with the dorks agent service
+DORKS_AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               'dave_fetchAI')
+
+
+def _pipeline():
+    """
+    Import dorks_agent on first use.
+
+    It needs the dave_fetchAI requirements (uagents among them), so services
+    that never pick this backend don't have to install them.
+    """
+    if DORKS_AGENT_DIR not in sys.path:
+        sys.path.append(DORKS_AGENT_DIR)
+    import dorks_agent
+    return dorks_agent
+
+
+class DorksBackend(SearchBackend):
+    """
+    The dorks pipeline: an LLM expands the query into Google dorks, each dork
+    runs through Custom Search, and the merged links come back ranked by how
+    many dorks found them. Dorks still running at the deadline are dropped.
+    """
+
+    name = "dorks"
+
+    def __init__(self, concurrency: Optional[int] = None, deadline_ms: Optional[int] = None):
+        self.concurrency = concurrency
+        self.deadline_ms = deadline_ms
+
+    async def search(self, query: str, num_results: Optional[int] = None) -> List[Dict[str, str]]:
+        dorks_agent = _pipeline()
+        deadline = dorks_agent.make_deadline(self.deadline_ms)
+        try:
+            dorks = dorks_agent.flatten_dorks(await dorks_agent.get_dorks(query, deadline=deadline))
+            all_results = await dorks_agent.search_dorks(dorks, self.concurrency, deadline)
+        except QuotaExceeded:
+            raise
+        except dorks_agent.DeadlineExceeded:
+            logger.warning(f"Deadline passed before any dork ran for query: {query}")
+            return []
+        except Exception as e:
+            logger.error(f"Error running dorks pipeline: {str(e)}")
+            return []
+
+        ranked, _ = dorks_agent.merge_results(all_results)
+        results = [{"title": entry["title"], "link": entry["link"], "snippet": entry["snippet"]}
+                   for entry in ranked]
+        return results[:num_results] if num_results else results
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from http_client import http
+from rate_limiter import QuotaExceeded
+from .base import SearchBackend, SearchError
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteSearchBackend(SearchBackend):
+    """
+    Search through another service's /google_search route (app.py).
+
+    Only for deployments where the search keys live with app.py; in-process
+    backends avoid the extra hop and the dependency on that service being up.
+    `backend` names the backend app.py should use on its side.
+    """
+
+    name = "remote"
+
+    def __init__(self, base_url: str, backend: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.backend = backend
+
+    async def search(self, query: str, num_results: Optional[int] = None) -> List[Dict[str, str]]:
+        return await asyncio.to_thread(self._post, query, num_results)
+
+    def _post(self, query: str, num_results: Optional[int]) -> List[Dict[str, str]]:
+        payload = {"query": query}
+        if self.backend:
+            payload["backend"] = self.backend
+        if num_results:
+            payload["num_results"] = num_results
+        try:
+            # No retries: a 429 from app.py means its rate limiter already waited as long as allowed
+            response = http.post(f"{self.base_url}/google_search", json=payload, retries=0,
+                                 headers={"Content-Type": "application/json"})
+        except Exception as e:
+            logger.error(f"Error calling remote search: {str(e)}")
+            return []
+
+        if response.status_code == 429:
+            # A proxy in between may answer 429 with an HTML or empty body
+            data = self._json(response) or {}
+            try:
+                retry_after = float(response.headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            raise QuotaExceeded(data.get("api", "remote_search"), data.get("reason", "rate"), retry_after)
+        if not response.ok:
+            logger.error(f"Error from remote search: {response.text}")
+            raise SearchError(response.status_code, response.text[:500])
+
+        data = self._json(response)
+        if data is None:
+            raise SearchError(response.status_code, "response is not JSON")
+        if data.get("status") != "success":
+            logger.error(f"Error in search results: {data.get('message')}")
+            return []
+        return data.get("results", [])
+
+    @staticmethod
+    def _json(response) -> Optional[dict]:
+        """The response body as a JSON object, or None if it isn't one"""
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
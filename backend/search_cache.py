@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def normalize_query(query: str) -> str:
+    """
+    Collapse whitespace in a search query.
+
+    Case is preserved on purpose: Google treats `OR`/`AND` as operators only
+    when they are upper case, so lower-casing would change the query.
+    """
+    return " ".join(query.split())
+
+
+def compact_response(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a Custom Search response body to the fields callers actually use.
+
+    Keeps title/link/snippet of every item and the next page pointer, which
+    keeps cache entries small enough to hold thousands of them in memory.
+    """
+    compact = {
+        "items": [
+            {
+                "title": item.get("title", ""),
+                "link": item.get("link", ""),
+                "snippet": item.get("snippet", "")
+            }
+            for item in data.get("items", [])
+        ]
+    }
+    next_page = data.get("queries", {}).get("nextPage")
+    if next_page:
+        compact["queries"] = {"nextPage": [{"startIndex": next_page[0].get("startIndex")}]}
+    return compact
+
+
+class SearchCache:
+    """
+    Two-tier TTL cache for Google Custom Search responses.
+
+    The first tier is an in-process LRU; the optional second tier is a SQLite
+    file so entries survive restarts. Keys are the search engine id (`cx`),
+    the normalized query and the `num`/`start` paging parameters, so callers
+    using different engines never share entries. Values must be JSON
+    serializable.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        """Build a cache from SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL and SEARCH_CACHE_DB"""
+        return cls(
+            max_entries=int(os.getenv("SEARCH_CACHE_SIZE", 1024)),
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", 3600)),
+            db_path=os.getenv("SEARCH_CACHE_DB") or None
+        )
+
+    @staticmethod
+    def make_key(query: str, num: int = 10, start: Optional[int] = None, cx: Optional[str] = None) -> str:
+        return json.dumps([cx or "", normalize_query(query), int(num), int(start or 1)])
+
+    def get(self, query: str, num: int = 10, start: Optional[int] = None,
+            cx: Optional[str] = None) -> Optional[Any]:
+        key = self.make_key(query, num, start, cx)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._counters["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        value = json.loads(row[0])
+                        self._store_memory(key, row[1], value)
+                        self._counters["hits"] += 1
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._counters["expirations"] += 1
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, query: str, value: Any, num: int = 10, start: Optional[int] = None,
+            ttl: Optional[float] = None, cx: Optional[str] = None):
+        key = self.make_key(query, num, start, cx)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._store_memory(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at)
+                )
+                self._db.commit()
+
+    def evict(self, query: str, num: int = 10, start: Optional[int] = None, cx: Optional[str] = None) -> bool:
+        """Drop a single entry from both tiers. Returns True if anything was removed."""
+        key = self.make_key(query, num, start, cx)
+        with self._lock:
+            removed = self._memory.pop(key, None) is not None
+            if self._db is not None:
+                cursor = self._db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self._db.commit()
+                removed = removed or cursor.rowcount > 0
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._memory)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["disk_enabled"] = self._db is not None
+            return stats
+
+    def _store_memory(self, key: str, expires_at: float, value: Any):
+        # Caller must hold self._lock
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+
+# Process-wide cache shared by every Custom Search caller
+search_cache = SearchCache.from_env()
@@ -0,0 +1,293 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+from http_client import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+# Kept beside this module: processes started from different directories must share one queue
+DEFAULT_QUEUE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "send_queue.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS send_jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    idempotency_key TEXT,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    message_id TEXT,
+    error TEXT,
+    claimed_by TEXT,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS send_jobs_idempotency ON send_jobs (user_id, idempotency_key);
+CREATE INDEX IF NOT EXISTS send_jobs_due ON send_jobs (status, next_attempt_at);
+"""
+
+# Columns returned by the status endpoint; the body is never echoed back
+JOB_FIELDS = ['id', 'user_id', 'idempotency_key', 'recipient', 'subject', 'status', 'attempts',
+              'next_attempt_at', 'message_id', 'error', 'created_at', 'updated_at']
+
+
+class PermanentSendError(Exception):
+    """Raised by a sender when retrying the job cannot succeed (bad address, revoked access)"""
+
+
+class SendQueue:
+    """
+    Durable SQLite queue of outgoing emails drained by a pool of worker threads.
+
+    Jobs move queued -> running -> sent | failed. Transient failures are
+    rescheduled with jittered exponential backoff until `max_attempts` is
+    reached. A (user, idempotency key) pair maps to at most one job, so a
+    client retrying its submission gets the original job back instead of a
+    second send.
+
+    Several processes may share one database (gunicorn workers, a restart
+    overlapping a send). A job is claimed in one immediate transaction that
+    only succeeds while it is still claimable, and the claim stores a
+    per-claim owner plus a lease. Only the owner can finish the job. A job
+    whose lease expired (its process died mid-send) is claimed again; keep
+    `lease` well above the longest a send can take, HTTP timeouts included.
+    """
+
+    def __init__(self, db_path: str = ":memory:", workers: int = 2, max_attempts: int = 5,
+                 backoff: float = 5, max_backoff: float = 300, lease: float = 300, poll_interval: float = 5):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Autocommit, with explicit BEGIN IMMEDIATE where a read and a write must be atomic
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._counters = {"submitted": 0, "duplicates": 0, "sent": 0, "retried": 0, "failed": 0, "db_errors": 0}
+
+    @classmethod
+    def from_env(cls) -> "SendQueue":
+        return cls(
+            db_path=os.getenv('SEND_QUEUE_DB', DEFAULT_QUEUE_DB),
+            workers=int(os.getenv('SEND_QUEUE_WORKERS', 2)),
+            max_attempts=int(os.getenv('SEND_QUEUE_MAX_ATTEMPTS', 5)),
+            backoff=float(os.getenv('SEND_QUEUE_BACKOFF', 5)),
+            max_backoff=float(os.getenv('SEND_QUEUE_MAX_BACKOFF', 300)),
+            lease=float(os.getenv('SEND_QUEUE_LEASE', 300))
+        )
+
+    def _migrate(self):
+        """Add the claim columns to queues created before they existed"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(send_jobs)")}
+        for column, kind in (("claimed_by", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE send_jobs ADD COLUMN {column} {kind}")
+
+    # -- submission and status ---------------------------------------------
+
+    def submit(self, user_id: str, recipient: str, subject: str, body: str,
+               idempotency_key: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Queue one email; returns (job, created). created is False for a repeated idempotency key"""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if idempotency_key:
+                row = self._db.execute("SELECT id FROM send_jobs WHERE user_id = ? AND idempotency_key = ?",
+                                       (user_id, idempotency_key)).fetchone()
+                if row:
+                    self._counters["duplicates"] += 1
+                    return self._get_locked(row[0]), False
+            try:
+                self._db.execute(
+                    "INSERT INTO send_jobs (id, user_id, idempotency_key, recipient, subject, body, status, "
+                    "next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (job_id, user_id, idempotency_key, recipient, subject, body, now, now, now)
+                )
+            except sqlite3.IntegrityError:
+                # Another process inserted the same idempotency key in between
+                row = self._db.execute("SELECT id FROM send_jobs WHERE user_id = ? AND idempotency_key = ?",
+                                       (user_id, idempotency_key)).fetchone()
+                self._counters["duplicates"] += 1
+                return self._get_locked(row[0]), False
+            self._counters["submitted"] += 1
+            job = self._get_locked(job_id)
+        self._wakeup.set()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._get_locked(job_id)
+
+    def _get_locked(self, job_id):
+        row = self._db.execute(f"SELECT {', '.join(JOB_FIELDS)} FROM send_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(JOB_FIELDS, row)) if row else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_status = dict(self._db.execute("SELECT status, COUNT(*) FROM send_jobs GROUP BY status").fetchall())
+            stats = dict(self._counters)
+        stats["jobs"] = by_status
+        stats["workers"] = sum(1 for thread in self._threads if thread.is_alive())
+        return stats
+
+    # -- workers -----------------------------------------------------------
+
+    def start(self, sender: Callable[[Dict], str]):
+        """
+        Start the worker threads.
+
+        `sender(job)` performs the send and returns the Gmail message id. It
+        raises PermanentSendError for failures not worth retrying; any other
+        exception is retried with backoff.
+        """
+        if self._threads:
+            return
+        # Running jobs are left alone: they may belong to another live process, and
+        # a claim whose process died is taken over once its lease expires
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(sender,), name=f"send-queue-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping.clear()
+
+    def _claim(self) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        Atomically claim the oldest due job (or one whose lease expired).
+
+        Otherwise returns when the next job is due or a lease runs out.
+        """
+        now = time.time()
+        claimable = ("(status = 'queued' AND next_attempt_at <= ?) "
+                     "OR (status = 'running' AND lease_expires_at <= ?)")
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                claimed = self._claim_locked(now, claimable)
+                self._db.execute("COMMIT")
+            except BaseException:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                raise
+            return claimed
+
+    def _claim_locked(self, now: float, claimable: str) -> Tuple[Optional[Dict], Optional[float]]:
+        """Claim step of `_claim`; runs inside its transaction"""
+        row = self._db.execute(
+            f"SELECT id FROM send_jobs WHERE {claimable} ORDER BY next_attempt_at LIMIT 1", (now, now)
+        ).fetchone()
+        if row is None:
+            upcoming = self._db.execute(
+                "SELECT MIN(due) FROM (SELECT next_attempt_at AS due FROM send_jobs WHERE status = 'queued' "
+                "UNION ALL SELECT lease_expires_at FROM send_jobs WHERE status = 'running')"
+            ).fetchone()[0]
+            return None, upcoming
+        claim = f"{self.owner}:{uuid.uuid4().hex[:8]}"
+        cursor = self._db.execute(
+            "UPDATE send_jobs SET status = 'running', attempts = attempts + 1, claimed_by = ?, "
+            f"lease_expires_at = ?, updated_at = ? WHERE id = ? AND ({claimable})",
+            (claim, now + self.lease, now, row[0], now, now)
+        )
+        if cursor.rowcount != 1:
+            return None, now
+        job = self._get_locked(row[0])
+        job["body"] = self._db.execute("SELECT body FROM send_jobs WHERE id = ?", (row[0],)).fetchone()[0]
+        job["claimed_by"] = claim
+        return job, None
+
+    def _finish(self, job: Dict, status: str, message_id: str = None, error: str = None,
+                next_attempt_at: float = None):
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE send_jobs SET status = ?, message_id = ?, error = ?, claimed_by = NULL, "
+                "lease_expires_at = NULL, next_attempt_at = COALESCE(?, next_attempt_at), updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND claimed_by = ?",
+                (status, message_id, error, next_attempt_at, time.time(), job["id"], job["claimed_by"])
+            )
+            if cursor.rowcount != 1:
+                logger.warning(f"Send job {job['id']} was claimed by another worker after its lease expired")
+            self._counters[{"sent": "sent", "queued": "retried", "failed": "failed"}[status]] += 1
+
+    def _db_error(self, action: str, error: Exception, failures: int) -> bool:
+        """Log a failed queue update and back off; returns False once the queue is stopping"""
+        with self._lock:
+            self._counters["db_errors"] += 1
+        delay = backoff_delay(failures, 0.5, self.poll_interval)
+        logger.error(f"Send queue could not {action} ({str(error)}), retrying in {delay:.1f}s")
+        return not self._stopping.wait(delay)
+
+    def _record(self, job: Dict, status: str, **fields):
+        """
+        Store a job's outcome, retrying while the database is busy.
+
+        The send already happened, so giving up would let the lease expire
+        and the job be sent again; only stopping the queue ends the retries.
+        """
+        failures = 0
+        while True:
+            try:
+                self._finish(job, status, **fields)
+                return
+            except Exception as e:
+                if not self._db_error(f"record send job {job['id']} as {status}", e, failures):
+                    logger.error(f"Send job {job['id']} left running; it is retried once its lease expires")
+                    return
+                failures += 1
+
+    def _work(self, sender):
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                job, upcoming = self._claim()
+            except Exception as e:
+                # Typically "database is locked" while other processes hold the file; keep the worker alive
+                self._db_error("claim a job", e, failures)
+                failures += 1
+                continue
+            failures = 0
+            if job is None:
+                # Poll as well: jobs submitted by other processes don't wake these threads
+                timeout = self.poll_interval if upcoming is None else min(self.poll_interval,
+                                                                           max(0.0, upcoming - time.time()))
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+                continue
+
+            try:
+                message_id = sender(job)
+            except PermanentSendError as e:
+                logger.error(f"Send job {job['id']} failed permanently: {str(e)}")
+                self._record(job, "failed", error=str(e))
+            except Exception as e:
+                if job["attempts"] >= self.max_attempts:
+                    logger.error(f"Send job {job['id']} failed after {job['attempts']} attempts: {str(e)}")
+                    self._record(job, "failed", error=str(e))
+                else:
+                    delay = backoff_delay(job["attempts"] - 1, self.backoff, self.max_backoff)
+                    logger.warning(f"Send job {job['id']} failed ({str(e)}), retrying in {delay:.1f}s")
+                    self._record(job, "queued", error=str(e), next_attempt_at=time.time() + delay)
+            else:
+                self._record(job, "sent", message_id=message_id)
@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from linkedin_urls import canonical_url
+
+
+def test_canonical_url_keeps_non_default_port():
+    assert canonical_url('http://www.Example.com:8080/a/') == 'https://example.com:8080/a'
+
+
+def test_canonical_url_ignores_malformed_port():
+    assert canonical_url('http://example.com:abc/x') == 'https://example.com/x'
@@ -0,0 +1,128 @@
+"""
+Throughput comparison: asyncio.run() per request vs. one long-lived background loop.
+
+Simulates the flask_search_app request shape (one request fans out to several
+upstream calls) against a local mock upstream with fixed latency, from a pool
+of worker threads like Flask's threaded server.
+
+    python benchmark_event_loop.py --requests 200 --workers 8 --fanout 8 --latency-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+
+# BackgroundLoop lives with the other shared modules in backend/
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from background_loop import BackgroundLoop
+
+
+def start_mock_upstream(port: int, latency: float):
+    """Serve a tiny JSON endpoint that sleeps `latency` seconds per request"""
+    async def handler(request):
+        await asyncio.sleep(latency)
+        return web.json_response({"items": [{"title": "t", "link": "https://example.com", "snippet": "s"}]})
+
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get("/", handler)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+
+
+async def fan_out(session: aiohttp.ClientSession, url: str, fanout: int):
+    async def one():
+        async with session.get(url) as response:
+            return await response.json()
+    return await asyncio.gather(*(one() for _ in range(fanout)))
+
+
+def run_per_request_loops(url: str, fanout: int):
+    """Today's behavior: a fresh event loop and session for every request"""
+    async def handle():
+        async with aiohttp.ClientSession() as session:
+            return await fan_out(session, url, fanout)
+    return asyncio.run(handle())
+
+
+def make_background_runner(url: str, fanout: int):
+    """New behavior: every request is submitted to one loop with one shared session"""
+    background = BackgroundLoop(name="benchmark-loop")
+    session = background.run(_create_session())
+
+    def handle():
+        return background.run(fan_out(session, url, fanout))
+
+    def close():
+        background.run(session.close())
+        background.stop()
+
+    return handle, close
+
+
+async def _create_session():
+    return aiohttp.ClientSession()
+
+
+def measure(label: str, handle, requests: int, workers: int):
+    latencies = []
+
+    def timed():
+        started = time.perf_counter()
+        handle()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(timed) for _ in range(requests)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{label:<28} {requests / elapsed:8.1f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+    return requests / elapsed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare per-request asyncio.run with a background event loop')
+    parser.add_argument('--requests', type=int, default=200, help='Total simulated API requests')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent Flask worker threads')
+    parser.add_argument('--fanout', type=int, default=8, help='Upstream calls per request (dorks per query)')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Simulated upstream latency')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the mock upstream')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    url = f"http://127.0.0.1:{args.port}/"
+    start_mock_upstream(args.port, args.latency_ms / 1000)
+
+    print(f"{args.requests} requests, {args.workers} workers, fan-out {args.fanout}, "
+          f"upstream latency {args.latency_ms:.0f} ms\n")
+    baseline = measure("asyncio.run per request", lambda: run_per_request_loops(url, args.fanout),
+                       args.requests, args.workers)
+    handle, close = make_background_runner(url, args.fanout)
+    try:
+        persistent = measure("persistent background loop", handle, args.requests, args.workers)
+    finally:
+        close()
+    print(f"\nSpeedup: {persistent / baseline:.2f}x")
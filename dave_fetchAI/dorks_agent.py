@@ -1,4 +1,5 @@
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import datetime
 from uuid import uuid4
@@ -10,9 +11,19 @@ from uagents_core.contrib.protocols.chat import (
     TextContent,
     chat_protocol_spec,
 )
-import requests
 import json
 import asyncio
+import time
+from typing import Optional
+
+# Shared backend modules (search cache, HTTP client) live next to this directory
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from search_cache import search_cache, compact_response
+from http_client import async_http
+from rate_limiter import rate_limiter, QuotaExceeded
+from linkedin_urls import canonical_url
+from dorks_memo import DorksMemo
+from prompt_builder import FewShotPromptBuilder
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,9 +38,18 @@ AGENTVERSE_API_KEY = os.getenv('AGENTVERSE_API_KEY')
 URL = "https://api.asi1.ai/v1/chat/completions"
 MODEL = "asi1-mini"
 
+# Seconds to wait for an ASI-1 completion; generations take far longer than the shared client's default
+ASI1_READ_TIMEOUT = float(os.getenv('ASI1_READ_TIMEOUT', 120))
+
 # Google Custom Search API Configuration
 GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
 
+# Maximum number of dork searches in flight at once
+DORK_CONCURRENCY = int(os.getenv('DORK_CONCURRENCY', 4))
+
+# Default per-request time budget in milliseconds (0 = no deadline)
+DORK_DEADLINE_MS = int(os.getenv('DORK_DEADLINE_MS', 0))
+
 # Headers for ASI-1 API
 HEADERS = {
     'Content-Type': 'application/json',
@@ -51,6 +71,9 @@ chat_proto = Protocol(spec=chat_protocol_spec)
 # Add this constant at the top with other configurations
 SPECIAL_TAG = "dave_links_only_2024"  # This is our special tag/fingerprint
 
+# Generated dorks are deterministic (temperature 0), so remember them per query
+dorks_memo = DorksMemo.from_env(strip_tags=(SPECIAL_TAG,))
+
 DORKS_TEMPLATE = """
 # Google Dork Syntax Quick Reference
 # ===============================
@@ -378,15 +401,67 @@ Return ONLY the JSON with dorks, nothing else.
 
 """
 
+# Send only the examples relevant to each query instead of the full template
+FEW_SHOT_PROMPTS = os.getenv('DORKS_FEW_SHOT', 'True').lower() == 'true'
+prompt_builder = FewShotPromptBuilder(
+    DORKS_TEMPLATE,
+    top_k=int(os.getenv('DORKS_PROMPT_TOP_K', 6)),
+    token_budget=int(os.getenv('DORKS_PROMPT_TOKEN_BUDGET', 1500))
+)
+
 # Define request and response models for REST endpoints
 class SearchRequest(Model):
     query: str
+    concurrency: Optional[int] = None
+    bypass_memo: bool = False
+    deadline_ms: Optional[int] = None
 
 class SearchResponse(Model):
     results: str
+    partial: bool = False
 
 class LinksResponse(Model):
     links: list
+    partial: bool = False
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before any dorks were available"""
+
+def make_deadline(deadline_ms: Optional[int] = None) -> Optional[float]:
+    """Absolute event-loop time by which a request must finish, or None for no deadline"""
+    deadline_ms = DORK_DEADLINE_MS if deadline_ms is None else deadline_ms
+    if not deadline_ms:
+        return None
+    return asyncio.get_running_loop().time() + deadline_ms / 1000
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return max(0.0, deadline - asyncio.get_running_loop().time())
+
+def parse_search_items(data: dict, limit: int) -> list:
+    """Turn a Custom Search response body into title/link/snippet dicts"""
+    return [
+        {
+            'title': item.get('title', ''),
+            'link': item.get('link', ''),
+            'snippet': item.get('snippet', '')
+        }
+        for item in data.get('items', [])[:limit]
+    ]
+
+async def _fetch_search_page(params: dict) -> dict:
+    cached = search_cache.get(params['q'], num=params['num'], start=params.get('start'), cx=params['cx'])
+    if cached is not None:
+        return cached
+    
+    await rate_limiter.acquire_async('google_cse')
+    response = await async_http.get(GOOGLE_SEARCH_URL, params=params)
+    response.raise_for_status()
+    data = compact_response(await response.json())
+    
+    search_cache.set(params['q'], data, num=params['num'], start=params.get('start'), cx=params['cx'])
+    return data
 
 async def get_google_search_results(dork: str, num_results: int = 3) -> list:
     try:
@@ -397,130 +472,306 @@ async def get_google_search_results(dork: str, num_results: int = 3) -> list:
             'num': num_results
         }
         
-        response = requests.get(GOOGLE_SEARCH_URL, params=params)
-        response.raise_for_status()
+        data = await _fetch_search_page(params)
+        search_results = parse_search_items(data, num_results)
         
-        data = response.json()
-        search_results = []
-        
-        if 'items' in data:
-            for item in data['items']:
-                search_results.append({
-                    'title': item.get('title', ''),
-                    'link': item.get('link', ''),
-                    'snippet': item.get('snippet', '')
-                })
-            
-            # If we didn't get enough results, try a second page
-            if len(search_results) < num_results and 'queries' in data and 'nextPage' in data['queries']:
-                next_page = data['queries']['nextPage'][0]['startIndex']
-                params['start'] = next_page
-                response = requests.get(GOOGLE_SEARCH_URL, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if 'items' in data:
-                    for item in data['items']:
-                        if len(search_results) < num_results:
-                            search_results.append({
-                                'title': item.get('title', ''),
-                                'link': item.get('link', ''),
-                                'snippet': item.get('snippet', '')
-                            })
+        # If we didn't get enough results, try a second page
+        if search_results and len(search_results) < num_results and 'nextPage' in data.get('queries', {}):
+            params['start'] = data['queries']['nextPage'][0]['startIndex']
+            data = await _fetch_search_page(params)
+            search_results += parse_search_items(data, num_results - len(search_results))
         
         return search_results[:num_results]  # Ensure we return exactly num_results
+    except QuotaExceeded:
+        # Surface quota exhaustion instead of reporting "no results"
+        raise
     except Exception as e:
         print(f"An error occurred: {e}")
         return []
 
-def format_results(all_results, links_only: bool = False):
-    formatted_output = []
+def flatten_dorks(dorks_data: dict) -> list:
+    """Flatten the LLM's {name: dork or [dorks]} JSON into ordered (key, dork) pairs"""
+    dorks = []
+    for dork_name, dork_queries in dorks_data.items():
+        if isinstance(dork_queries, list):
+            for idx, dork_query in enumerate(dork_queries, 1):
+                dorks.append((f"{dork_name}_{idx}", dork_query))
+        else:
+            dorks.append((dork_name, dork_queries))
+    return dorks
+
+async def iter_dork_results(dorks: list, concurrency: Optional[int] = None, deadline: Optional[float] = None):
+    """
+    Run every dork search concurrently with at most `concurrency` requests in flight.
+
+    Yields (index, key, dork, results) tuples in completion order, so callers
+    can stream each dork as soon as it resolves. Once `deadline` passes the
+    generator stops and searches still running are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or DORK_CONCURRENCY))
+
+    async def run(idx, key, dork_query):
+        async with semaphore:
+            return idx, key, dork_query, await get_google_search_results(dork_query)
+
+    tasks = [asyncio.ensure_future(run(idx, key, dork_query)) for idx, (key, dork_query) in enumerate(dorks)]
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=time_left(deadline)):
+            try:
+                result = await next_done
+            except asyncio.TimeoutError:
+                return
+            yield result
+    finally:
+        # Don't leave searches running if the consumer stops early
+        for task in tasks:
+            task.cancel()
+
+async def search_dorks(dorks: list, concurrency: Optional[int] = None, deadline: Optional[float] = None) -> dict:
+    """
+    Run every dork search concurrently and collect the results.
+
+    Results are keyed and ordered exactly like the input (key, dork) pairs,
+    regardless of the order in which the searches complete. Dorks that had
+    not finished by `deadline` are left out.
+    """
+    completed = {}
+    async for idx, key, dork_query, search_results in iter_dork_results(dorks, concurrency, deadline):
+        completed[idx] = search_results
+    return {
+        key: {'dork': dork_query, 'results': completed[idx]}
+        for idx, (key, dork_query) in enumerate(dorks)
+        if idx in completed
+    }
+
+def merge_results(all_results):
+    """
+    Collapse equivalent URLs across every dork in one pass and rank them.
+
+    Links are keyed by `canonical_url`, so www./uk./in. subdomains, trailing
+    slashes and query strings of one LinkedIn profile count once, but each
+    entry keeps the first-seen link as returned by the search. Empty links
+    are skipped. Returns (merged, duplicates_removed): merged holds one dict
+    per unique link with its first-seen title/snippet and the dorks that
+    found it, sorted by how many dorks hit it, then by first appearance.
+    """
+    merged = {}
+    duplicates = 0
     for dork_name, data in all_results.items():
-        if not links_only:
-            formatted_output.append(f"\nDork: {data['dork']}\n")
-        
-        if not data['results']:
-            if not links_only:
-                formatted_output.append("No results found for this dork.\n")
-            continue
-            
-        for idx, result in enumerate(data['results'], 1):
-            if links_only:
-                formatted_output.append(result['link'])
-            else:
-                formatted_output.append(f"Result {idx}:")
-                formatted_output.append(f"Title: {result['title']}")
-                formatted_output.append(f"Link: {result['link']}")
-                formatted_output.append(f"Description: {result['snippet']}\n")
+        for result in data['results']:
+            key = canonical_url(result['link'])
+            if not key:
+                continue
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = {
+                    'link': result['link'],
+                    'title': result['title'],
+                    'snippet': result['snippet'],
+                    'dorks': [dork_name]
+                }
+                continue
+            duplicates += 1
+            if dork_name not in entry['dorks']:
+                entry['dorks'].append(dork_name)
+    # sorted() is stable, so equally ranked links keep their first-seen order
+    ranked = sorted(merged.values(), key=lambda entry: len(entry['dorks']), reverse=True)
+    return ranked, duplicates
+
+def format_results(all_results, links_only: bool = False):
+    ranked, duplicates = merge_results(all_results)
+    if links_only:
+        return "\n".join(entry['link'] for entry in ranked)
+    
+    formatted_output = ["\nDorks:"]
+    for data in all_results.values():
+        formatted_output.append(f"- {data['dork']}")
+    formatted_output.append("")
+    
+    if not ranked:
+        formatted_output.append("No results found for these dorks.\n")
+    for idx, entry in enumerate(ranked, 1):
+        formatted_output.append(f"Result {idx} (matched by {len(entry['dorks'])} dork(s)):")
+        formatted_output.append(f"Title: {entry['title']}")
+        formatted_output.append(f"Link: {entry['link']}")
+        formatted_output.append(f"Description: {entry['snippet']}\n")
+    if duplicates:
+        formatted_output.append(f"Removed {duplicates} duplicate link(s).")
     return "\n".join(formatted_output)
 
 # Add extract_links function to get just links
 def extract_links(all_results):
-    links = []
-    for data in all_results.values():
-        for result in data['results']:
-            links.append(result['link'])
-    return links
-
-async def process_query(query, links_only=False):
-    """Process a search query and return results"""
-    try:
-        # Prepare prompt
+    """Unique links, ranked by how many dorks found them"""
+    return [entry['link'] for entry in merge_results(all_results)[0]]
+
+async def generate_dorks(query: str) -> dict:
+    """Ask ASI-1 to turn a natural-language query into a dict of dorks"""
+    # Prepare prompt
+    if FEW_SHOT_PROMPTS:
+        prompt, prompt_stats = prompt_builder.build(query)
+        print(f"Prompt uses {prompt_stats['examples']} examples, ~{prompt_stats['prompt_tokens']} tokens "
+              f"(saved ~{prompt_stats['tokens_saved']} of {prompt_stats['full_tokens']})")
+    else:
         prompt = DORKS_TEMPLATE.format(query=query)
+    
+    # Prepare ASI-1 request
+    payload = {
+        "model": MODEL,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0,
+        "stream": False,
+        "max_tokens": 0
+    }
+    
+    # Make request to ASI-1
+    await rate_limiter.acquire_async('asi1')
+    # Not retried: a completion that timed out may still have been generated and billed
+    response = await async_http.post(URL, headers=HEADERS, json=payload, read_timeout=ASI1_READ_TIMEOUT)
+    response.raise_for_status()
+    body = await response.json()
+    
+    # Get content and clean JSON
+    content = body["choices"][0]["message"]["content"]
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.endswith("```"):
+        content = content[:-3]
+    content = content.strip()
+    
+    # Parse the dorks from JSON
+    return json.loads(content)
+
+async def _generate_and_memoize(query: str) -> dict:
+    dorks_data = await generate_dorks(query)
+    dorks_memo.set(query, dorks_data)
+    return dorks_data
+
+def _discard_result(task):
+    # Retrieve the outcome of an abandoned generation so asyncio doesn't log it as unhandled
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background dork generation failed: {task.exception()}")
+
+async def get_dorks(query: str, bypass_memo: bool = False, deadline: Optional[float] = None) -> dict:
+    """
+    Return memoized dorks for `query`, generating them with ASI-1 on a miss.
+
+    If `deadline` passes first, DeadlineExceeded is raised but the ASI-1 call
+    keeps running in the background, so the memo has the dorks next time.
+    """
+    # Reuse previously generated dorks unless the caller asks for a fresh answer
+    dorks_data = None if bypass_memo else dorks_memo.get(query)
+    if dorks_data is None:
+        task = asyncio.ensure_future(_generate_and_memoize(query))
+        try:
+            dorks_data = await asyncio.wait_for(asyncio.shield(task), time_left(deadline))
+        except asyncio.TimeoutError:
+            task.add_done_callback(_discard_result)
+            raise DeadlineExceeded("Deadline passed while generating dorks")
+    return dorks_data
+
+async def run_query(query, links_only=False, concurrency=None, bypass_memo=False, deadline_ms=None) -> dict:
+    """
+    Process a search query within an optional deadline.
+
+    Returns a dict with "links" or "results" plus "partial", "dorks_total",
+    "dorks_completed" and "elapsed_ms". When the deadline passes, the dorks
+    that finished in time are returned and "partial" is True.
+    """
+    started = time.monotonic()
+    deadline = make_deadline(deadline_ms)
+    outcome = {"partial": False, "dorks_total": 0, "dorks_completed": 0}
+    try:
+        dorks = flatten_dorks(await get_dorks(query, bypass_memo, deadline))
         
-        # Prepare ASI-1 request
-        payload = {
-            "model": MODEL,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0,
-            "stream": False,
-            "max_tokens": 0
-        }
-        
-        # Make request to ASI-1
-        response = requests.post(URL, headers=HEADERS, json=payload)
+        # Fan out all dork searches at once, bounded by `concurrency`
+        all_results = await search_dorks(dorks, concurrency, deadline)
+        outcome.update(partial=len(all_results) < len(dorks), dorks_total=len(dorks),
+                       dorks_completed=len(all_results))
+    except DeadlineExceeded:
+        all_results = {}
+        outcome["partial"] = True
+    
+    ranked, outcome["duplicates_removed"] = merge_results(all_results)
+    if links_only:
+        outcome["links"] = [entry['link'] for entry in ranked]
+    else:
+        outcome["results"] = format_results(all_results, links_only=False)
+        if outcome["partial"]:
+            outcome["results"] += (f"\n\nPartial results: {outcome['dorks_completed']} of "
+                                   f"{outcome['dorks_total']} dorks completed before the deadline.")
+    outcome["elapsed_ms"] = int((time.monotonic() - started) * 1000)
+    return outcome
+
+async def process_query(query, links_only=False, concurrency=None, bypass_memo=False, deadline_ms=None):
+    """Process a search query and return results"""
+    try:
+        outcome = await run_query(query, links_only, concurrency, bypass_memo, deadline_ms)
+        return outcome["links"] if links_only else outcome["results"]
+    except Exception as e:
+        return f"Error processing query: {str(e)}"
+
+async def stream_query(query, links_only=False, concurrency=None, bypass_memo=False, deadline_ms=None):
+    """
+    Process a search query, yielding one record per event as soon as it happens.
+
+    Records are dicts with a `type` of "dorks" (the generated dorks), "result"
+    (one per dork, in completion order), then a final "summary" or "error".
+    A result record only carries links no earlier record already sent; the
+    summary ranks every unique link by dork hits. If the deadline passes, the
+    summary has "partial": true.
+    """
+    started = time.monotonic()
+    deadline = make_deadline(deadline_ms)
+    dorks = []
+    completed = 0
+    total_results = 0
+    all_results = {}
+    seen = set()
+    try:
+        try:
+            dorks = flatten_dorks(await get_dorks(query, bypass_memo, deadline))
+        except DeadlineExceeded:
+            pass
+        else:
+            yield {"type": "dorks", "dorks": [dork_query for _, dork_query in dorks]}
         
-        if response.status_code == 200:
-            # Get content and clean JSON
-            content = response.json()["choices"][0]["message"]["content"]
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            # Parse the dorks from JSON
-            dorks_data = json.loads(content)
-            
-            # Get search results for each dork
-            all_results = {}
-            for dork_name, dork_queries in dorks_data.items():
-                if isinstance(dork_queries, list):
-                    for idx, dork_query in enumerate(dork_queries, 1):
-                        search_results = await get_google_search_results(dork_query)
-                        all_results[f"{dork_name}_{idx}"] = {
-                            'dork': dork_query,
-                            'results': search_results
-                        }
-                else:
-                    search_results = await get_google_search_results(dork_queries)
-                    all_results[dork_name] = {
-                        'dork': dork_queries,
-                        'results': search_results
-                    }
-            
+        async for idx, key, dork_query, search_results in iter_dork_results(dorks, concurrency, deadline):
+            completed += 1
+            total_results += len(search_results)
+            all_results[key] = {'dork': dork_query, 'results': search_results}
+            fresh = []
+            for result in search_results:
+                link_key = canonical_url(result['link'])
+                if link_key and link_key not in seen:
+                    seen.add(link_key)
+                    fresh.append(result)
+            record = {"type": "result", "index": idx, "key": key, "dork": dork_query}
             if links_only:
-                return extract_links(all_results)
+                record["links"] = [result['link'] for result in fresh]
             else:
-                return format_results(all_results, links_only=False)
+                record["results"] = fresh
+            yield record
+        
+        ranked, duplicates = merge_results(all_results)
+        yield {
+            "type": "summary",
+            "dorks": len(dorks),
+            "dorks_completed": completed,
+            "partial": not dorks or completed < len(dorks),
+            "total_results": total_results,
+            "unique_links": len(ranked),
+            "duplicates_removed": duplicates,
+            "ranked": [{"link": entry['link'], "hits": len(entry['dorks'])} for entry in ranked],
+            "elapsed_ms": int((time.monotonic() - started) * 1000)
+        }
     except Exception as e:
-        return f"Error processing query: {str(e)}"
+        yield {"type": "error", "error": f"Error processing query: {str(e)}"}
 
 @agent.on_event("startup")
 async def startup(ctx: Context):
@@ -539,13 +790,16 @@ async def handle_search(ctx: Context, request: SearchRequest) -> SearchResponse:
     query = request.query.replace(SPECIAL_TAG, "").strip()
     
     # Process the query
+    try:
+        outcome = await run_query(query, links_only=links_only, concurrency=request.concurrency,
+                                  bypass_memo=request.bypass_memo, deadline_ms=request.deadline_ms)
+    except Exception as e:
+        return SearchResponse(results=f"Error processing query: {str(e)}")
     if links_only:
-        links = await process_query(query, links_only=True)
-        result = {"links": links}
-        return SearchResponse(results=json.dumps(result))
+        result = {"links": outcome["links"]}
+        return SearchResponse(results=json.dumps(result), partial=outcome["partial"])
     else:
-        result = await process_query(query)
-        return SearchResponse(results=result)
+        return SearchResponse(results=outcome["results"], partial=outcome["partial"])
 
 # REST endpoint for links-only response
 @agent.on_rest_post("/links", SearchRequest, LinksResponse)
@@ -553,8 +807,12 @@ async def handle_links(ctx: Context, request: SearchRequest) -> LinksResponse:
     ctx.logger.info(f"Received REST links request: {request.query}")
     
     # Process the query for links only
-    links = await process_query(request.query, links_only=True)
-    return LinksResponse(links=links)
+    try:
+        outcome = await run_query(request.query, links_only=True, concurrency=request.concurrency,
+                                  bypass_memo=request.bypass_memo, deadline_ms=request.deadline_ms)
+    except Exception as e:
+        return LinksResponse(links=[f"Error processing query: {str(e)}"])
+    return LinksResponse(links=outcome["links"], partial=outcome["partial"])
 
 @chat_proto.on_message(ChatMessage)
 async def handle_message(ctx: Context, sender: str, msg: ChatMessage):
@@ -0,0 +1,98 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class DorksMemo:
+    """
+    Persistent natural-language query -> generated dorks store.
+
+    ASI-1 is called with temperature 0, so the same query always produces the
+    same dorks and the answer can be reused. Entries live in SQLite so they
+    survive restarts; `max_entries` evicts the least recently used rows and
+    `ttl` bounds how long an answer is trusted.
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_entries: int = 5000, ttl: float = 7 * 24 * 3600,
+                 strip_tags: tuple = ()):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.strip_tags = strip_tags
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dorks_memo ("
+            "query TEXT PRIMARY KEY, dorks TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS dorks_memo_last_used ON dorks_memo (last_used)")
+        self._db.commit()
+
+    @classmethod
+    def from_env(cls, strip_tags: tuple = ()) -> "DorksMemo":
+        """Build a memo from DORKS_MEMO_DB, DORKS_MEMO_SIZE and DORKS_MEMO_TTL"""
+        return cls(
+            db_path=os.getenv("DORKS_MEMO_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             "dorks_memo.sqlite3")),
+            max_entries=int(os.getenv("DORKS_MEMO_SIZE", 5000)),
+            ttl=float(os.getenv("DORKS_MEMO_TTL", 7 * 24 * 3600)),
+            strip_tags=strip_tags
+        )
+
+    def normalize(self, query: str) -> str:
+        """Lower-case, drop special tags and collapse whitespace"""
+        for tag in self.strip_tags:
+            query = query.replace(tag, " ")
+        return " ".join(query.lower().split())
+
+    def get(self, query: str) -> Optional[dict]:
+        key = self.normalize(query)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT dorks, expires_at FROM dorks_memo WHERE query = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._db.execute("DELETE FROM dorks_memo WHERE query = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE dorks_memo SET last_used = ? WHERE query = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, query: str, dorks: dict):
+        key = self.normalize(query)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO dorks_memo (query, dorks, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(dorks), now + self.ttl, now)
+            )
+            # Keep only the most recently used `max_entries` rows
+            size = self._db.execute("SELECT COUNT(*) FROM dorks_memo").fetchone()[0]
+            if size > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM dorks_memo WHERE query IN "
+                    "(SELECT query FROM dorks_memo ORDER BY last_used ASC LIMIT ?)",
+                    (size - self.max_entries,)
+                )
+            self._db.commit()
+
+    def evict(self, query: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM dorks_memo WHERE query = ?", (self.normalize(query),))
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM dorks_memo").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "size": size}
@@ -46,6 +46,49 @@ def send_links_query(query):
     except Exception as e:
         return {"error": str(e)}
 
+def stream_query(query, links_only=False, links_endpoint=False):
+    """Send a streaming query and yield each NDJSON record as soon as it arrives"""
+    if links_only and not links_endpoint:
+        query = f"{SPECIAL_TAG} {query}"
+    endpoint = FLASK_LINKS_ENDPOINT if links_endpoint else FLASK_SEARCH_ENDPOINT
+    
+    print(f"Streaming query from Flask: '{query}'")
+    
+    with requests.post(
+        endpoint,
+        json={"query": query, "stream": "ndjson"},
+        headers={'Content-Type': 'application/json'},
+        stream=True
+    ) as response:
+        print(f"Response status code: {response.status_code}")
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
+
+def print_stream_record(record):
+    """Print a single streamed record"""
+    if record["type"] == "dorks":
+        print(f"\nGenerated {len(record['dorks'])} dorks")
+    elif record["type"] == "result":
+        print(f"\nDork: {record['dork']}")
+        if "links" in record:
+            for link in record["links"]:
+                print(link)
+        else:
+            if not record["results"]:
+                print("No results found for this dork.")
+            for idx, result in enumerate(record["results"], 1):
+                print(f"Result {idx}:")
+                print(f"Title: {result['title']}")
+                print(f"Link: {result['link']}")
+                print(f"Description: {result['snippet']}\n")
+    elif record["type"] == "summary":
+        print(f"\nDone: {record['total_results']} results from {record['dorks']} dorks "
+              f"in {record['elapsed_ms']} ms")
+    else:
+        print(record)
+
 def parse_args():
     parser = argparse.ArgumentParser(description='Send queries to the Flask search endpoints')
     parser.add_argument('--query', '-q', type=str, help='Query string to send to the server')
@@ -53,6 +96,8 @@ def parse_args():
                         help='Get only links in the response')
     parser.add_argument('--links-endpoint', '-e', action='store_true',
                         help='Use the dedicated links endpoint')
+    parser.add_argument('--stream', '-s', action='store_true',
+                        help='Print each dork\'s results as soon as it resolves')
     return parser.parse_args()
 
 if __name__ == "__main__":
@@ -63,7 +108,13 @@ if __name__ == "__main__":
         args.query = input("Enter your query: ")
     
     # Send the query and get results
-    if args.links_endpoint:
+    if args.stream:
+        try:
+            for record in stream_query(args.query, args.links_only, args.links_endpoint):
+                print_stream_record(record)
+        except Exception as e:
+            print({"error": str(e)})
+    elif args.links_endpoint:
         result = send_links_query(args.query)
         print("\nRESULT (LINKS ONLY):")
         if "links" in result:
@@ -1,10 +1,10 @@
 import os
+import atexit
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import requests
 import json
-import asyncio
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,7 +16,11 @@ GOOGLE_CSE_ID = os.getenv('GOOGLE_CSE_ID')
 AGENTVERSE_API_KEY = os.getenv('AGENTVERSE_API_KEY')
 
 # Import the processing functions from dorks_agent.py
-from dorks_agent import process_query, SPECIAL_TAG
+from dorks_agent import run_query, stream_query, SPECIAL_TAG, dorks_memo, prompt_builder
+from search_cache import search_cache
+from http_client import async_http
+from rate_limiter import rate_limiter
+from background_loop import BackgroundLoop  # Shared module in backend/, on the path via dorks_agent
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -26,24 +30,56 @@ PORT = int(os.getenv("PORT", 5001))
 HOST = os.getenv("HOST", "0.0.0.0")
 DEBUG = os.getenv("DEBUG", "True").lower() == "true"
 
+# One event loop for the whole process: requests are submitted to it instead of
+# spinning up a loop per request, so the aiohttp session and its connections persist
+loop = BackgroundLoop(name="dorks-search-loop")
+atexit.register(lambda: loop.run(async_http.close(), timeout=5))
+
+def stream_format(data):
+    """Return "ndjson", "sse" or None depending on the request's `stream` option"""
+    stream = data.get('stream', request.args.get('stream'))
+    if not stream or str(stream).lower() in ('false', '0'):
+        return None
+    if str(stream).lower() == 'sse' or 'text/event-stream' in request.headers.get('Accept', ''):
+        return 'sse'
+    return 'ndjson'
+
+def stream_response(records, fmt):
+    """Drive an async record generator and stream each record as NDJSON or SSE"""
+    def generate():
+        for record in loop.iterate(records):
+            if fmt == 'sse':
+                yield f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+            else:
+                yield json.dumps(record) + "\n"
+    
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    return Response(generate(), mimetype=mimetype, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/search', methods=['POST'])
 def search():
     try:
         data = request.get_json()
         query = data.get('query', '')
+        concurrency = data.get('concurrency')
+        bypass_memo = bool(data.get('bypass_memo', False))
+        deadline_ms = data.get('deadline_ms')
         
         # Check if the special tag is present
         links_only = SPECIAL_TAG in query
         # Remove the tag from the query if present
         clean_query = query.replace(SPECIAL_TAG, "").strip()
         
-        # Use the event loop to run the async function
-        if links_only:
-            links = asyncio.run(process_query(clean_query, links_only=True))
-            return jsonify({"links": links})
-        else:
-            results = asyncio.run(process_query(clean_query))
-            return jsonify({"results": results})
+        # Stream each dork's results as soon as it resolves
+        fmt = stream_format(data)
+        if fmt:
+            return stream_response(stream_query(clean_query, links_only=links_only, concurrency=concurrency,
+                                                bypass_memo=bypass_memo, deadline_ms=deadline_ms), fmt)
+        
+        # Use the event loop to run the async function; past the deadline, completed dorks come back as partial
+        outcome = loop.run(run_query(clean_query, links_only=links_only, concurrency=concurrency,
+                                     bypass_memo=bypass_memo, deadline_ms=deadline_ms))
+        return jsonify(outcome)
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -53,10 +89,19 @@ def links():
     try:
         data = request.get_json()
         query = data.get('query', '')
+        concurrency = data.get('concurrency')
+        bypass_memo = bool(data.get('bypass_memo', False))
+        deadline_ms = data.get('deadline_ms')
         
         # Always get links only from this endpoint
-        links = asyncio.run(process_query(query, links_only=True))
-        return jsonify({"links": links})
+        fmt = stream_format(data)
+        if fmt:
+            return stream_response(stream_query(query, links_only=True, concurrency=concurrency,
+                                                bypass_memo=bypass_memo, deadline_ms=deadline_ms), fmt)
+        
+        outcome = loop.run(run_query(query, links_only=True, concurrency=concurrency,
+                                     bypass_memo=bypass_memo, deadline_ms=deadline_ms))
+        return jsonify(outcome)
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -65,6 +110,26 @@ def links():
 def health_check():
     return jsonify({"status": "healthy"})
 
+@app.route('/search_cache/stats', methods=['GET'])
+def search_cache_stats():
+    return jsonify(search_cache.stats())
+
+@app.route('/dorks_memo/stats', methods=['GET'])
+def dorks_memo_stats():
+    return jsonify(dorks_memo.stats())
+
+@app.route('/prompt/stats', methods=['GET'])
+def prompt_stats():
+    return jsonify(prompt_builder.stats())
+
+@app.route('/http/stats', methods=['GET'])
+def http_stats():
+    return jsonify(async_http.stats())
+
+@app.route('/rate_limits/stats', methods=['GET'])
+def rate_limits_stats():
+    return jsonify(rate_limiter.stats())
+
 @app.route('/', methods=['GET'])
 def home():
     return jsonify({
@@ -73,7 +138,12 @@ def home():
         "endpoints": [
             {"path": "/search", "method": "POST", "description": "Search with Google dorks"},
             {"path": "/links", "method": "POST", "description": "Get only links from search"},
-            {"path": "/health", "method": "GET", "description": "Health check endpoint"}
+            {"path": "/health", "method": "GET", "description": "Health check endpoint"},
+            {"path": "/search_cache/stats", "method": "GET", "description": "Search cache hit/miss counters"},
+            {"path": "/dorks_memo/stats", "method": "GET", "description": "Generated dorks memo hit/miss counters"},
+            {"path": "/prompt/stats", "method": "GET", "description": "Few-shot prompt token savings"},
+            {"path": "/http/stats", "method": "GET", "description": "Outbound HTTP pool usage"},
+            {"path": "/rate_limits/stats", "method": "GET", "description": "Per-API rate limit and daily quota usage"}
         ]
     })
 
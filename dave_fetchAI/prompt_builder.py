@@ -0,0 +1,118 @@
+import math
+import re
+import threading
+from collections import Counter
+
+EXAMPLE_PATTERN = re.compile(r'^Natural Query:\s*"?(.*?)"?\s*\nDork:\s*(.+)$', re.MULTILINE)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+REFERENCE_MARKER = "# Google Dork Syntax Reference"
+QUERY_MARKER = "now following is the user query"
+
+PROMPT_HEADER = """# Google Dorks Examples
+# Convert the natural query into Google dorks, following these examples.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def _terms(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class FewShotPromptBuilder:
+    """
+    Builds a compact dork-generation prompt from DORKS_TEMPLATE.
+
+    The template's "Natural Query -> Dork" pairs are indexed once with TF-IDF.
+    For each request only the top-k examples most similar to the user query
+    are kept, together with the operator reference, within a token budget.
+    """
+
+    def __init__(self, template: str, top_k: int = 6, token_budget: int = 1500):
+        self.template = template
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.full_tokens = estimate_tokens(template.format(query=""))
+
+        reference_start = template.find(REFERENCE_MARKER)
+        query_start = template.find(QUERY_MARKER)
+        self.reference = template[reference_start:query_start].strip() + "\n"
+        self.instructions = template[query_start:]
+
+        # Index the examples once: raw text plus a normalized TF-IDF vector each
+        self.examples = [
+            {"query": query, "text": f'Natural Query: "{query}"\nDork: {dork.strip()}\n'}
+            for query, dork in EXAMPLE_PATTERN.findall(template[:reference_start])
+        ]
+        document_terms = [Counter(_terms(example["query"])) for example in self.examples]
+        document_frequency = Counter(term for terms in document_terms for term in terms)
+        total = len(self.examples)
+        self.idf = {term: math.log((1 + total) / (1 + count)) + 1 for term, count in document_frequency.items()}
+        for example, terms in zip(self.examples, document_terms):
+            example["vector"] = self._vectorize(terms)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_saved = 0
+
+    def _vectorize(self, terms: Counter) -> dict:
+        vector = {term: count * self.idf.get(term, 0.0) for term, count in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def select_examples(self, query: str) -> list:
+        """Return the top-k examples ranked by cosine similarity to `query`"""
+        query_vector = self._vectorize(Counter(_terms(query)))
+        scored = [
+            (sum(weight * example["vector"].get(term, 0.0) for term, weight in query_vector.items()), idx)
+            for idx, example in enumerate(self.examples)
+        ]
+        # Ties keep template order, so an unmatched query still gets the leading examples
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self.examples[idx] for _, idx in scored[:self.top_k]]
+
+    def build(self, query: str):
+        """
+        Build the prompt for `query`.
+
+        Returns a (prompt, stats) tuple where stats reports the estimated
+        prompt tokens, the full template tokens and the tokens saved.
+        """
+        tail = self.instructions.format(query=query)
+        used = estimate_tokens(PROMPT_HEADER) + estimate_tokens(self.reference) + estimate_tokens(tail)
+
+        chosen = []
+        for example in self.select_examples(query):
+            cost = estimate_tokens(example["text"])
+            if used + cost > self.token_budget:
+                break
+            chosen.append(example["text"])
+            used += cost
+
+        prompt = PROMPT_HEADER + "\n" + "\n".join(chosen) + "\n" + self.reference + "\n\n" + tail
+        prompt_tokens = estimate_tokens(prompt)
+        full_tokens = self.full_tokens + estimate_tokens(query)
+        saved = max(0, full_tokens - prompt_tokens)
+
+        with self._lock:
+            self.requests += 1
+            self.tokens_saved += saved
+
+        return prompt, {
+            "examples": len(chosen),
+            "prompt_tokens": prompt_tokens,
+            "full_tokens": full_tokens,
+            "tokens_saved": saved
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "indexed_examples": len(self.examples),
+                "requests": self.requests,
+                "tokens_saved": self.tokens_saved
+            }